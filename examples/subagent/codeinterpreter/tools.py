@@ -1,3 +1,4 @@
+import functools
 from typing import Any, Dict
 
 from pydantic import BaseModel
@@ -43,6 +44,16 @@ class CodeGenerationAgent(Agent):
         super().__init__(config=config, **kwargs)
 
 
+class CodeResponse(BaseModel):
+    code: str
+
+
+@functools.lru_cache(maxsize=1)
+def _shared_code_agent() -> CodeGenerationAgent:
+    """Build the code generation sub-agent once and reuse its LLM client."""
+    return CodeGenerationAgent()
+
+
 class CodeInterpreterTool(BaseTool):
     """A tool that delegates a task to a sub-agent and executes the code it generates."""
 
@@ -58,18 +69,13 @@ class CodeInterpreterTool(BaseTool):
         """
         Delegates a task to a CodeGenerationAgent and executes the returned code.
         """
-        sub_agent = CodeGenerationAgent()
+        sub_agent = _shared_code_agent()
         sub_agent_thread = Thread(metadata={"parent_task": task_description})
-        self.memory.set(sub_agent_thread)
 
         prompt = f"Your task is to write a Python script that does the following: {task_description}"
         sub_agent_thread.add_event(type="user_input", data=prompt)
-        self.memory.set(sub_agent_thread)
 
         # Direct LLM call, bypassing the agent loop
-        class CodeResponse(BaseModel):
-            code: str
-
         messages = [
             {"role": "system", "content": sub_agent.config.system_prompt},
             {"role": "user", "content": prompt},
@@ -85,6 +91,8 @@ class CodeInterpreterTool(BaseTool):
         sub_agent_thread.add_event(
             type="llm_response", data={"generated_code": generated_code}
         )
+        # Checkpoint before running the generated code so the prompt and code
+        # survive a crash inside exec.
         self.memory.set(sub_agent_thread)
 
         if not generated_code:
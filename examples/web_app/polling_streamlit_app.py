@@ -191,11 +191,11 @@ if st.session_state.thread_id:
                     .get("mime_type", "")
                     .startswith("image/")
                 ):
-                    import base64
-
+                    # The API replaces inline image data with a URL to the
+                    # decoded bytes, which the browser fetches and caches.
                     response_content = event_data["response"]
                     st.image(
-                        base64.b64decode(response_content["data"]),
+                        f"{API_BASE_URL}{response_content['artifact_url']}",
                         caption=f"Image from tool ({response_content.get('mime_type')})",
                     )
                 elif isinstance(event_data, dict):
@@ -2,11 +2,70 @@ import time
 import requests
 import streamlit as st
 import os
-from streamlit_autorefresh import st_autorefresh
+import string
 
 # API base URL
 API_BASE_URL = "http://localhost:8001"
 
+# Per-event card markup. Styling lives in the page CSS below so each event only
+# ships the badges and the message text.
+EVENT_TMPL = string.Template(
+    "<div class='hica-event'>"
+    "<span class='hica-badge hica-badge-type'>$event_type</span>"
+    "<span class='hica-badge hica-badge-intent'>$intent</span>"
+    "<span class='hica-event-message'>$message</span>"
+    "</div>"
+)
+
+
+@st.cache_resource
+def get_page_css() -> str:
+    """Build the static page stylesheet once per server process."""
+    return """
+    <style>
+    .stChatMessage {
+        border-radius: 10px;
+        padding: 10px;
+        margin: 5px 0;
+        max-width: 80%;
+    }
+    .user .stChatMessage {
+        background-color: #e6f3ff;
+        align-self: flex-start;
+    }
+    .assistant .stChatMessage {
+        background-color: #f0f0f0;
+        align-self: flex-end;
+    }
+    .hica-event {
+        background-color: rgba(79, 142, 247, 0.08);
+        border-radius: 8px;
+        padding: 10px 16px;
+        margin-bottom: 8px;
+        border-left: 5px solid #4F8EF7;
+    }
+    .hica-badge {
+        display: inline-block;
+        color: #fff;
+        border-radius: 4px;
+        padding: 2px 8px;
+        font-size: 0.85em;
+        margin-right: 8px;
+    }
+    .hica-badge-type {
+        background: #0d439e;
+    }
+    .hica-badge-intent {
+        background: #4F8EF7;
+    }
+    .hica-event-message {
+        font-size: 1.05em;
+        margin-left: 8px;
+        color: inherit;
+    }
+    </style>
+    """
+
 # Initialize session state
 if "thread_id" not in st.session_state:
     st.session_state.thread_id = None
@@ -47,7 +106,9 @@ def poll_new_events():
 
 # --- Conditional autorefresh: only while job is not completed ---
 if st.session_state.status not in ("completed", "failed"):
-    
+    # Imported here so terminal threads never load or instantiate the widget.
+    from streamlit_autorefresh import st_autorefresh
+
     st_autorefresh(interval=2000, key="polling")
     poll_new_events()
 
@@ -59,6 +120,11 @@ def load_tools():
             response = requests.get(f"{API_BASE_URL}/tools")
             response.raise_for_status()
             st.session_state.tools_list = response.json().get("tools", [])
+            # Render the sidebar list once; reruns reuse the joined markdown.
+            st.session_state.tools_markdown = "\n".join(
+                f"- **{tool['name']}**: {tool['description']}"
+                for tool in st.session_state.tools_list
+            )
         except requests.RequestException as e:
             st.session_state.tools_list = []  # Avoid retrying
             st.toast(f"Could not fetch tools: {e}", icon="⚠️")
@@ -141,8 +207,7 @@ with st.sidebar:
     # List all available tools from session state
     st.header("Available Tools")
     if st.session_state.tools_list:
-        for tool in st.session_state.tools_list:
-            st.markdown(f"- **{tool['name']}**: {tool['description']}")
+        st.markdown(st.session_state.tools_markdown)
     else:
         st.write("No tools available or could not fetch.")
 
@@ -182,11 +247,11 @@ if st.session_state.thread_id:
                         .get("mime_type", "")
                         .startswith("image/")
                     ):
-                        import base64
-
+                        # The backend serves the decoded bytes with an immutable
+                        # cache header, so the browser fetches each image once.
                         response_content = event_data["response"]
                         st.image(
-                            base64.b64decode(response_content["data"]),
+                            f"{API_BASE_URL}{response_content['artifact_url']}",
                             caption=f"Image from tool ({response_content.get('mime_type')})",
                         )
                     elif isinstance(event_data, dict):
@@ -197,35 +262,11 @@ if st.session_state.thread_id:
                         # If message is None or empty, show empty string
                         message_str = message if message not in (None, "None") else ""
                         st.markdown(
-                            f"""
-                            <div style='
-                                background-color: rgba(79, 142, 247, 0.08);
-                                border-radius: 8px;
-                                padding: 10px 16px;
-                                margin-bottom: 8px;
-                                border-left: 5px solid #4F8EF7;
-                            '>
-                                <span style='
-                                    display: inline-block;
-                                    background: #0d439e;
-                                    color: #fff;
-                                    border-radius: 4px;
-                                    padding: 2px 8px;
-                                    font-size: 0.85em;
-                                    margin-right: 8px;
-                                '>{event_type.upper()}</span>
-                                <span style='
-                                    display: inline-block;
-                                    background: #4F8EF7;
-                                    color: #fff;
-                                    border-radius: 4px;
-                                    padding: 2px 8px;
-                                    font-size: 0.85em;
-                                    margin-right: 8px;
-                                '>{intent.upper()}</span>
-                                <span style='font-size: 1.05em; margin-left: 8px; color: inherit;'>{message_str}</span>
-                            </div>
-                            """,
+                            EVENT_TMPL.substitute(
+                                event_type=event_type.upper(),
+                                intent=intent.upper(),
+                                message=message_str,
+                            ),
                             unsafe_allow_html=True,
                         )
                         # Show additional fields if present (excluding intent and message)
@@ -258,27 +299,7 @@ if st.button("Send"):
             create_thread(user_input)
 
 # Add custom CSS for better styling
-st.markdown(
-    """
-    <style>
-    .stChatMessage {
-        border-radius: 10px;
-        padding: 10px;
-        margin: 5px 0;
-        max-width: 80%;
-    }
-    .user .stChatMessage {
-        background-color: #e6f3ff;
-        align-self: flex-start;
-    }
-    .assistant .stChatMessage {
-        background-color: #f0f0f0;
-        align-self: flex-end;
-    }
-    </style>
-    """,
-    unsafe_allow_html=True,
-)
+st.markdown(get_page_css(), unsafe_allow_html=True)
 
 if st.button("Refresh"):
     st.rerun()
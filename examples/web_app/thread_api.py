@@ -0,0 +1,564 @@
+"""
+Thread endpoints shared by server_local.py and server_mcp.py.
+
+Both servers expose the same thread API and differ only in how they fill
+`global_registry` (local tools only vs. local + MCP tools), so the routes,
+request/response models, store and agent setup live here once and each server
+includes `router`.
+"""
+
+import asyncio
+import base64
+import functools
+import hashlib
+import logging
+import os
+import zlib
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from typing import Dict, List, Optional, Set, Tuple
+from uuid import UUID
+
+import httpx
+import instructor
+import orjson
+import structlog
+from dotenv import load_dotenv
+from fastapi import (
+    APIRouter,
+    Depends,
+    FastAPI,
+    HTTPException,
+    Request,
+)
+from fastapi.responses import FileResponse, Response, StreamingResponse
+from openai import AsyncOpenAI
+from pydantic import BaseModel
+from pymongo import MongoClient
+
+from hica import Agent, AgentConfig, ConversationMemoryStore
+from hica.core import Event, Thread
+from hica.logging import logger
+from hica.tools import ToolRegistry
+
+load_dotenv()
+
+# This registry is populated by the server module at import/startup
+# and used by all API requests.
+global_registry = ToolRegistry()
+
+
+# Request and response models
+class CreateThreadRequest(BaseModel):
+    user_input: str
+    metadata: Optional[Dict] = None
+
+
+class ResumeThreadRequest(BaseModel):
+    user_input: str
+
+
+class ThreadResponse(BaseModel):
+    thread_id: str
+    events: List[Dict]
+    status: str
+    awaiting_human_response: bool
+
+
+# Agent configuration
+agent_config = AgentConfig(
+    model="openai/gpt-4.1-mini",
+    system_prompt=(
+        "You are an autonomous agent. Reason carefully to select tools based on their name, description, and parameters. "
+        "Analyze the user input, identify the required operation, and determine if clarification is needed."
+    ),
+    context_format="json",
+)
+
+# One LLM client for every agent in the process. HTTP/2 multiplexes concurrent
+# agent turns over a few kept-alive connections instead of a TLS handshake each.
+llm_http_client = httpx.AsyncClient(
+    http2=True,
+    limits=httpx.Limits(max_connections=100, max_keepalive_connections=50),
+)
+llm_client = instructor.from_openai(
+    AsyncOpenAI(http_client=llm_http_client),
+    model=agent_config.model.removeprefix("openai/"),
+)
+
+# Conversation memory store: an append-only event log per thread by default
+# (so each step and resume writes only its new events), or 'file' / 'mongo'.
+# Intermediate agent-loop states are coalesced into one write per interval.
+STORE_FLUSH_INTERVAL = 0.25
+# This server is the store's only writer, so hot threads can be served from memory.
+STORE_CACHE_SIZE = 1024
+backend_type = os.getenv("HICA_BACKEND_TYPE", "log")
+if backend_type == "mongo":
+    mongo_uri = os.getenv("HICA_MONGO_URI", "mongodb://localhost:27017")
+    mongo_db = os.getenv("HICA_MONGO_DB", "hica")
+    mongo_collection = os.getenv("HICA_MONGO_COLLECTION", "threads")
+    # One pooled client for the whole process, shared by every store operation
+    mongo_client = MongoClient(
+        mongo_uri, maxPoolSize=50, minPoolSize=5, serverSelectionTimeoutMS=2000
+    )
+    store = ConversationMemoryStore(
+        backend_type="mongo",
+        mongo_db=mongo_db,
+        mongo_collection=mongo_collection,
+        mongo_client=mongo_client,
+        flush_interval=STORE_FLUSH_INTERVAL,
+        cache_size=STORE_CACHE_SIZE,
+    )
+else:
+    mongo_client = None
+    store = ConversationMemoryStore(
+        backend_type=backend_type,
+        context_dir="context",
+        flush_interval=STORE_FLUSH_INTERVAL,
+        cache_size=STORE_CACHE_SIZE,
+    )
+
+
+# Threads are processed by a fixed pool of workers pulling from this queue, so
+# a burst of requests cannot start an unbounded number of agent loops.
+THREAD_WORKERS = int(os.getenv("HICA_WORKERS", "8"))
+job_queue: asyncio.Queue = asyncio.Queue()
+
+
+async def thread_worker() -> None:
+    """Process queued (thread, thread_id, metadata) jobs until a None sentinel."""
+    while True:
+        job = await job_queue.get()
+        try:
+            if job is None:
+                return
+            await process_thread(*job)
+        except Exception as e:
+            logger.error("Thread processing failed", thread_id=job[1], error=str(e))
+        finally:
+            job_queue.task_done()
+
+
+@asynccontextmanager
+async def api_lifespan(app: FastAPI):
+    """Start the store and thread workers; drain both on shutdown."""
+    if mongo_client is not None:
+        app.state.mongo_client = mongo_client
+        store.mongo_store.ensure_indexes()
+    app.state.job_queue = job_queue
+    workers = [asyncio.create_task(thread_worker()) for _ in range(THREAD_WORKERS)]
+    yield
+    # Sentinels queue up behind pending jobs, so accepted threads still finish.
+    for _ in workers:
+        job_queue.put_nowait(None)
+    await asyncio.gather(*workers)
+    store.flush()
+    await llm_http_client.aclose()
+    if mongo_client is not None:
+        mongo_client.close()
+
+
+def get_context_dir():
+    # Helper for file path in context download endpoint
+    return getattr(store, "dir_path", None) or getattr(store, "context_dir", None)
+
+
+async def get_thread_or_404(thread_id: UUID) -> Thread:
+    """Dependency that loads the thread named in the path or responds 404."""
+    # A cache miss reads and parses the thread from disk or the database;
+    # aget does that on a worker thread so other requests keep being served.
+    thread = await store.aget(str(thread_id))
+    if not thread:
+        raise HTTPException(status_code=404, detail="Thread not found")
+    return thread
+
+
+def thread_etag(thread: Thread) -> str:
+    """Weak ETag from the event count and a checksum of the last event."""
+    last_event = thread.serialized_events(len(thread.events) - 1)[-1:]
+    return f'W/"{len(thread.events)}-{zlib.crc32(orjson.dumps(last_event)):x}"'
+
+
+def check_etag(request: Request, response: Response, etag: str) -> Optional[Response]:
+    """
+    Return a 304 response if the client already has this version; otherwise
+    tag the outgoing response. no-cache makes clients revalidate every poll.
+    """
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
+
+
+# Images are immutable once a tool has produced them, so browsers may cache
+# them forever.
+ARTIFACT_CACHE_HEADERS = {"Cache-Control": "public, max-age=31536000, immutable"}
+
+
+def get_image_payload(event: Event) -> Optional[Dict]:
+    """Return the image payload of a tool_response event, if it carries one."""
+    if event.type != "tool_response" or not isinstance(event.data, dict):
+        return None
+    response = event.data.get("response")
+    if isinstance(response, dict) and str(response.get("mime_type", "")).startswith(
+        "image/"
+    ):
+        return response
+    return None
+
+
+@functools.lru_cache(maxsize=256)
+def artifact_digest(data: str) -> str:
+    """Content hash naming an image artifact; stable when event indexes shift."""
+    return hashlib.sha256(data.encode()).hexdigest()[:32]
+
+
+def serialize_events(thread: Thread, since: int = 0) -> List[Dict]:
+    """Dump events for the API, replacing inline images with artifact URLs."""
+    serialized = thread.serialized_events(since)
+    for index, event in enumerate(thread.events[since:], start=since):
+        image = get_image_payload(event)
+        if image is not None:
+            event_dict = dict(serialized[index - since])
+            event_dict["data"] = {
+                **event.data,
+                "response": {
+                    "mime_type": image["mime_type"],
+                    "artifact_url": (
+                        f"/threads/{thread.thread_id}/artifact/"
+                        f"{artifact_digest(image['data'])}"
+                    ),
+                },
+            }
+            serialized[index - since] = event_dict
+    return serialized
+
+
+# Live /stream subscribers per thread and the threads queued or being processed.
+# process_thread pushes (index, event) pairs; STREAM_RESET means the event list
+# was rewritten (summarized) and is re-sent from index 0; None ends a run.
+thread_subscribers: Dict[str, Set[asyncio.Queue]] = defaultdict(set)
+active_threads: Set[str] = set()
+STREAM_RESET = object()
+
+
+def publish_events(thread: Thread, since: int, version: int) -> Tuple[int, int]:
+    """
+    Push events[since:] to the thread's stream subscribers.
+
+    `version` is the thread's events_version at the previous call; if
+    summarization has rewritten the list since, subscribers are reset and sent
+    every event again. Returns the (offset, version) for the next call.
+    """
+    subscribers = thread_subscribers.get(thread.thread_id)
+    if thread.events_version != version:
+        since = 0
+        for queue in subscribers or ():
+            queue.put_nowait(STREAM_RESET)
+    if subscribers:
+        for index, event in enumerate(serialize_events(thread, since), start=since):
+            for queue in subscribers:
+                queue.put_nowait((index, event))
+    return len(thread.events), thread.events_version
+
+
+def close_streams(thread_id: str) -> None:
+    for queue in thread_subscribers.get(thread_id, ()):
+        queue.put_nowait(None)
+
+
+@functools.lru_cache(maxsize=1)
+def get_base_agent() -> Agent:
+    """Build the shared agent once per process."""
+    return Agent(config=agent_config, tool_registry=global_registry, client=llm_client)
+
+
+async def process_thread(thread: Thread, thread_id: str, metadata: Dict) -> Thread:
+    """Run the agent loop for a thread using the global tool registry."""
+    active_threads.add(thread_id)
+    try:
+        # Bind the thread context for every log line emitted while this job
+        # runs, including those from the agent, instead of building a logger
+        # per thread. The user-supplied metadata goes under its own key so its
+        # keys cannot clash with thread_id.
+        with structlog.contextvars.bound_contextvars(
+            thread_id=thread_id, user_metadata=metadata
+        ):
+            logger.info("Processing thread", user_input=thread.events[-1].data)
+
+            agent = get_base_agent().with_metadata(metadata)
+            published, version = len(thread.events), thread.events_version
+            try:
+                async for intermediate_thread in agent.agent_loop(thread):
+                    store.set(intermediate_thread)
+                    published, version = publish_events(
+                        intermediate_thread, published, version
+                    )
+                    logger.debug(
+                        "Intermediate state saved",
+                        event_count=len(intermediate_thread.events),
+                    )
+            finally:
+                # Intermediate states were coalesced by the store's write
+                # buffer; persist the final one now rather than at the next
+                # flush. aflush writes a snapshot off the event loop, so a
+                # /resume appending to the thread meanwhile is safe.
+                await store.aflush(thread_id)
+            # The event dump is only worth building if INFO is actually
+            # emitted; serialized_events reuses the dumps made for the API.
+            if logger.isEnabledFor(logging.INFO):
+                logger.info("Thread completed", events=thread.serialized_events())
+    finally:
+        # Always end the run for /stream clients, even if it failed early
+        active_threads.discard(thread_id)
+        close_streams(thread_id)
+    return thread
+
+
+async def queue_thread(thread: Thread, thread_id: str, metadata: Dict) -> None:
+    """
+    Queue a thread for the workers.
+
+    The thread counts as active from now on, not only once a worker picks it
+    up, so a /stream opened in between stays open for the run's events.
+    """
+    active_threads.add(thread_id)
+    await job_queue.put((thread, thread_id, metadata))
+
+
+router = APIRouter()
+
+
+@router.post("/threads", response_model=ThreadResponse)
+async def create_thread(request: CreateThreadRequest):
+    """
+    Create a new thread and queue it for the agent workers.
+    Returns immediately with the thread_id so the client can start polling.
+    """
+    metadata = request.metadata or {"userid": "default", "role": "user"}
+    thread = Thread(
+        events=[Event(type="user_input", data=request.user_input)],
+        metadata={"user_metadata": metadata},
+    )
+    store.set(thread)
+    thread_id = thread.thread_id
+
+    # Run the agent loop on the worker pool
+    await queue_thread(thread, thread_id, metadata)
+
+    return ThreadResponse(
+        thread_id=thread_id,
+        events=serialize_events(thread),
+        status="queued",
+        awaiting_human_response=thread.awaiting_human_response(),
+    )
+
+
+@router.post("/threads/{thread_id}/resume", response_model=ThreadResponse)
+async def resume_thread(
+    thread_id: UUID,
+    request: ResumeThreadRequest,
+    thread: Thread = Depends(get_thread_or_404),
+):
+    """Resume an existing thread with clarification input."""
+    if not thread.awaiting_human_response():
+        raise HTTPException(
+            status_code=400, detail="Thread is not awaiting human response"
+        )
+
+    clarification_event = Event(type="user_input", data=request.user_input)
+    logger.info(
+        "Continuing existing thread from clarification request",
+        thread_id=str(thread_id),
+        user_input=request.user_input,
+    )
+
+    # Append clarification event
+    thread.append_event(clarification_event)
+    store.set(thread)  # Save the new event immediately
+
+    # Queue the thread for the workers with its original metadata
+    metadata = thread.metadata.get("user_metadata", {})
+    await queue_thread(thread, str(thread_id), metadata)
+
+    return ThreadResponse(
+        thread_id=str(thread_id),
+        events=serialize_events(thread),
+        status="queued",
+        awaiting_human_response=False,  # Just responded, so not awaiting now
+    )
+
+
+@router.get("/threads/{thread_id}", response_model=ThreadResponse)
+async def get_thread(
+    request: Request,
+    response: Response,
+    thread_id: UUID,
+    thread: Thread = Depends(get_thread_or_404),
+):
+    """Retrieve thread information."""
+    not_modified = check_etag(request, response, thread_etag(thread))
+    if not_modified is not None:
+        return not_modified
+    awaiting = thread.awaiting_human_response()
+    return ThreadResponse(
+        thread_id=str(thread_id),
+        events=serialize_events(thread),
+        status="awaiting_response" if awaiting else "completed",
+        awaiting_human_response=awaiting,
+    )
+
+
+@router.get("/threads/{thread_id}/context-file", response_class=FileResponse)
+async def get_thread_context_file(thread_id: UUID):
+    """Download the thread's context as a JSON file."""
+    filename = f"context_{str(thread_id)}.json"
+    # A thread still in the store's write buffer is newer than its file (or
+    # has no file yet), and only the 'file' backend keeps a <id>.json that can
+    # be sent as is ('log' keeps an event log), so otherwise send the thread's
+    # JSON from memory.
+    thread = store.buffered(str(thread_id))
+    if thread is None and store.backend_type != "file":
+        thread = await get_thread_or_404(thread_id)
+    if thread is not None:
+        return Response(
+            content=thread.to_json(),
+            media_type="application/json",
+            headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+        )
+
+    context_dir = get_context_dir()
+    if not context_dir:
+        raise HTTPException(
+            status_code=500, detail="Context directory not available for this backend"
+        )
+    file_path = context_dir / f"{thread_id}.json"
+    # Stat off the event loop and hand the result to FileResponse so it does
+    # not stat the file again before sending it.
+    try:
+        stat_result = await asyncio.to_thread(os.stat, file_path)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Context file not found")
+
+    return FileResponse(
+        path=str(file_path),
+        stat_result=stat_result,
+        filename=filename,
+        media_type="application/json",
+    )
+
+
+@router.get("/threads/{thread_id}/events")
+async def get_new_events(
+    request: Request,
+    response: Response,
+    since: int = 0,
+    thread: Thread = Depends(get_thread_or_404),
+):
+    """Return only new events since a given index."""
+    not_modified = check_etag(request, response, thread_etag(thread))
+    if not_modified is not None:
+        return not_modified
+    events = serialize_events(thread, since)
+    return {"events": events, "total": len(thread.events)}
+
+
+@router.get("/threads/{thread_id}/stream")
+async def stream_events(
+    request: Request,
+    thread_id: UUID,
+    since: int = 0,
+    thread: Thread = Depends(get_thread_or_404),
+):
+    """
+    Stream events as Server-Sent Events, starting at index `since`.
+
+    Reconnecting clients may send Last-Event-ID instead. The stream ends when
+    the thread is no longer queued or being processed. A `reset` event means
+    the history was summarized: clients drop their events, and the following
+    events are re-sent from id 0.
+    """
+    last_event_id = request.headers.get("last-event-id")
+    if last_event_id is not None and last_event_id.isdigit():
+        since = int(last_event_id) + 1
+
+    # Subscribe before reading the backlog so no event falls in between.
+    queue: asyncio.Queue = asyncio.Queue()
+    subscribers = thread_subscribers[str(thread_id)]
+    subscribers.add(queue)
+    backlog = serialize_events(thread, since)
+    running = str(thread_id) in active_threads
+
+    async def event_stream():
+        next_index = since
+        try:
+            for index, event in enumerate(backlog, start=since):
+                yield b"id: %d\ndata: %s\n\n" % (index, orjson.dumps(event))
+                next_index = index + 1
+            while running:
+                item = await queue.get()
+                if item is None:
+                    break
+                if item is STREAM_RESET:
+                    next_index = 0
+                    yield b"event: reset\ndata: {}\n\n"
+                    continue
+                index, event = item
+                if index < next_index:
+                    continue  # already sent as part of the backlog
+                yield b"id: %d\ndata: %s\n\n" % (index, orjson.dumps(event))
+                next_index = index + 1
+        finally:
+            subscribers.discard(queue)
+            if (
+                not subscribers
+                and thread_subscribers.get(str(thread_id)) is subscribers
+            ):
+                del thread_subscribers[str(thread_id)]
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+
+@router.get("/threads/{thread_id}/artifact/{digest}")
+async def get_thread_artifact(digest: str, thread: Thread = Depends(get_thread_or_404)):
+    """
+    Serve the raw image produced by a tool_response event.
+
+    Artifacts are addressed by a hash of their content rather than by event
+    index, which shifts after summarization, so the URL can be cached forever.
+    """
+    for event in reversed(thread.events):
+        image = get_image_payload(event)
+        if image is not None and artifact_digest(image["data"]) == digest:
+            break
+    else:
+        raise HTTPException(status_code=404, detail="Artifact not found")
+
+    return Response(
+        content=base64.b64decode(image["data"]),
+        media_type=image["mime_type"],
+        headers=ARTIFACT_CACHE_HEADERS,
+    )
+
+
+# (registry version, encoded /tools body); rebuilt only when the registry changes
+_tools_payload: Tuple[int, bytes] = (-1, b"")
+
+
+def get_tools_payload() -> bytes:
+    """Return the encoded /tools response, rebuilding it after registry changes."""
+    global _tools_payload
+    if _tools_payload[0] != global_registry.version:
+        tools = [
+            {"name": name, "description": tool_def.description or ""}
+            for name, tool_def in global_registry.get_tool_definitions().items()
+        ]
+        _tools_payload = (global_registry.version, orjson.dumps({"tools": tools}))
+    return _tools_payload[1]
+
+
+@router.get("/tools")
+def list_tools():
+    """List all available tools from the globally loaded registry."""
+    return Response(content=get_tools_payload(), media_type="application/json")
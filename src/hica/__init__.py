@@ -1,5 +1,5 @@
 from .agent import Agent, AgentConfig
 from .cli import run_cli
 from .core import Event, Thread
-from .tools import ToolRegistry
+from .tools import ToolRegistry, get_mcp_manager
 from .memory import ConversationMemoryStore
\ No newline at end of file
@@ -1,22 +1,105 @@
-from typing import AsyncGenerator, Dict, Generic, List, Optional, Type, TypeVar
+import asyncio
+import contextlib
+import copy
+import functools
+import hashlib
+import logging
+import random
+import re
+import time
+import weakref
+from typing import (
+    Annotated,
+    AsyncGenerator,
+    Dict,
+    Generic,
+    List,
+    Literal,
+    Optional,
+    Tuple,
+    Type,
+    TypeVar,
+    Union,
+)
 
 import instructor
-from pydantic import BaseModel, Field, model_validator
+import openai
+import orjson
+from pydantic import BaseModel, Field, create_model
 
 from hica.core import Thread
 from hica.logging import logger
+from hica.memory import MemoryStore
 from hica.models import (
     ClarificationRequest,
     DoneForNow,
     DynamicToolCall,
+    Event,
     FinalResponse,
     ToolResult,
     serialize_mcp_result,
 )
-from hica.tools import BaseTool, ToolRegistry, create_model_from_tool_schema
+from hica.tools import (
+    BaseTool,
+    ToolRegistry,
+    create_model_from_tool_schema,
+    tool_needs_arguments,
+)
 
 T = TypeVar("T")
 
+DECIDE_TOOL_INSTRUCTION = (
+    "IMPORTANT: Only call tools when they are absolutely necessary. If the USER's task is general or you already know the answer, respond without calling tools. NEVER make redundant tool calls as these are very expensive."
+    "IMPORTANT: If you state that you will use a tool, immediately call that tool as your next action."
+    "Based on the conversation and tool results, select the next tool (intent) "
+    "and provide its arguments as per the tool's parameter schema. "
+    "When a tool name is explicitly mentioned in the context, use that tool. "
+    "Respond with 'done' if the task is complete, or 'clarification' if more information is needed."
+)
+
+FINAL_RESPONSE_INSTRUCTION = (
+    "Based on the conversation history and tool execution results, "
+    "provide a clear and concise response to the user's original request. "
+    "Summarize the key findings or results in a user-friendly way."
+)
+
+# Providers that only cache a prompt prefix when it is explicitly marked.
+# OpenAI and Gemini cache a stable prefix implicitly, so it is sent as is.
+EXPLICIT_PROMPT_CACHE_PROVIDERS = {"anthropic"}
+# Providers that accept a prompt_cache_key to route requests sharing a prefix
+# to the same cache.
+PROMPT_CACHE_KEY_PROVIDERS = {"openai"}
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (about four characters per token) for prompt budgeting."""
+    return (len(text) + 3) // 4
+
+
+def prune_to_token_budget(
+    messages: List[Dict[str, str]], max_tokens: int
+) -> List[Dict[str, str]]:
+    """
+    Fit chat history into roughly max_tokens.
+
+    Keeps the first message (the original request) and as many of the most
+    recent messages as fit, replacing the dropped middle with a short note.
+    """
+    costs = [estimate_tokens(message["content"]) for message in messages]
+    if sum(costs) <= max_tokens or len(messages) < 3:
+        return messages
+    budget = max_tokens - costs[0]
+    start = len(messages)
+    while start > 1 and costs[start - 1] <= budget:
+        start -= 1
+        budget -= costs[start]
+    omitted = start - 1
+    note = {
+        "role": "user",
+        "content": f"[{omitted} earlier messages omitted to fit the context window]",
+    }
+    return [messages[0], note, *messages[start:]]
+
 
 class AgentConfig(BaseModel):
     """Configuration for the autonomous agent."""
@@ -30,6 +113,103 @@ class AgentConfig(BaseModel):
         "If you require further input or clarification, respond with 'clarification'."
     )
     max_events_before_summarization: Optional[int] = 20
+    # Also summarize once the history sent to the LLM is estimated above this
+    # many tokens. Both limits are checked before every step of agent_loop.
+    max_history_tokens_before_summarization: Optional[int] = None
+    # Approximate token budget for each LLM call; older history beyond it is
+    # dropped (the first message is always kept). None sends the full history.
+    max_context_tokens: Optional[int] = None
+    # agent_loop picks the tool and fills its arguments in one LLM call; set
+    # True to use separate select_tool and fill_parameters calls instead
+    # (for models that struggle with a wide union of tool schemas).
+    two_stage_toolcall: bool = False
+    # Let a single-call step return several independent tool calls, which are
+    # then executed concurrently (at most max_parallel_tools at a time).
+    parallel_tool_calls: bool = False
+    max_parallel_tools: int = 4
+    # Reuse responses for identical (model, messages, response model) calls
+    # when the agent has a response_cache store; ttl in seconds, None = forever.
+    enable_response_cache: bool = True
+    response_cache_ttl: Optional[float] = None
+    # Limit on concurrent LLM calls from this agent and its with_metadata
+    # copies; None leaves concurrency to the caller.
+    max_concurrent_llm_calls: Optional[int] = None
+    # Retries for rate-limited, timed-out or 5xx LLM calls, and the longest
+    # wait between attempts in seconds.
+    llm_max_retries: int = 5
+    llm_retry_max_delay: float = 30.0
+
+
+def _message_tokens(message: Dict) -> int:
+    """Estimated tokens of a chat message with str or content-block content."""
+    content = message["content"]
+    if isinstance(content, str):
+        return estimate_tokens(content)
+    return sum(estimate_tokens(block.get("text", "")) for block in content)
+
+
+# Provider errors worth retrying: request timeout, conflict, rate limit and
+# transient server errors. Other 4xx errors fail immediately.
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+
+
+def _retryable_error(error: BaseException) -> Optional[BaseException]:
+    """
+    Return the provider error to retry on, if any.
+
+    instructor may wrap provider errors, so the cause chain is searched too.
+    """
+    seen = 0
+    while error is not None and seen < 5:
+        if isinstance(error, openai.APIConnectionError):  # includes timeouts
+            return error
+        if getattr(error, "status_code", None) in RETRYABLE_STATUS_CODES:
+            return error
+        error = error.__cause__ or error.__context__
+        seen += 1
+    return None
+
+
+def _retry_delay(error: BaseException, attempt: int, max_delay: float) -> float:
+    """Seconds to wait before retry number attempt (0-based)."""
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        return min(float(headers.get("retry-after")), max_delay)
+    except (TypeError, ValueError):
+        # Exponential backoff with jitter so concurrent agents spread out
+        return random.uniform(0.5, 1.0) * min(max_delay, 0.5 * 2**attempt)
+
+
+# instructor clients shared by every Agent using the same model, so agents
+# built per request reuse one HTTP connection pool instead of opening their own.
+# Keyed by event loop first: a pool's connections belong to the loop that
+# opened them, and entries go away with their loop.
+_CLIENT_CACHE: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+@functools.lru_cache(maxsize=256)
+def _response_model_fingerprint(response_model: Type[BaseModel]) -> str:
+    """JSON schema of a response model, so cache keys change with the schema."""
+    return orjson.dumps(
+        response_model.model_json_schema(), option=orjson.OPT_SORT_KEYS
+    ).decode()
+
+
+class Response(BaseModel):
+    """Default run_llm response model when the caller does not pass one."""
+
+    response: str
+
+
+class ContextSummary(BaseModel):
+    """Response model for summarize_thread_with_llm."""
+
+    summary: str = Field(
+        ...,
+        description="A concise summary of the key facts, decisions, and outcomes from the conversation history.",
+    )
 
 
 class Agent(Generic[T]):
@@ -40,91 +220,214 @@ class Agent(Generic[T]):
         config: AgentConfig,
         tool_registry: Optional[ToolRegistry] = None,
         metadata: Optional[Dict[str, any]] = None,
+        client: Optional[instructor.AsyncInstructor] = None,
+        response_cache: Optional[MemoryStore] = None,
     ):
         self.config = config
+        self.response_cache = response_cache
         self.tool_registry = tool_registry or ToolRegistry()
         self.response_model: Type[BaseModel] = DynamicToolCall
         self.metadata = metadata or {}
         self._tool_metadata_cache: Optional[str] = None
-        logger.info(
-            "Agent initialized", config=config.model_dump(), metadata=self.metadata
+        self._tool_metadata_version: int = -1
+        # Response models generated from the tool registry, valid for
+        # _tool_models_version and rebuilt only after tools change.
+        self._tool_models_version: int = -1
+        self._tool_selection_models: Dict[Tuple[str, ...], Type[BaseModel]] = {}
+        self._param_models: Dict[str, Type[BaseModel]] = {}
+        self._tool_decision_models: Dict[bool, Type[BaseModel]] = {}
+        # (base prompt, registry version, full system prompt with tools,
+        # its estimated tokens)
+        self._system_prompt_cache: Optional[Tuple[str, int, str, int]] = None
+        # (full system prompt, system message dict, extra request options)
+        self._system_message_cache: Optional[Tuple[str, Dict, Dict]] = None
+        # Fields common to every log line from this agent are bound once
+        self.log = logger.bind(model=config.model)
+        self.log.info(
+            "Agent initialized",
+            system_prompt_tokens=self._system_prompt_tokens(),
+            metadata=self.metadata,
         )
-        self.client = instructor.from_provider(self.config.model, async_client=True)
+        if self.log.isEnabledFor(logging.DEBUG):
+            self.log.debug("Agent config", config=config.model_dump())
+        # Agents share one client per model and event loop unless a client is
+        # passed in; see the client property
+        self._client = client
+        self._tool_semaphore = asyncio.Semaphore(config.max_parallel_tools)
+        self._llm_semaphore: Optional[asyncio.Semaphore] = (
+            asyncio.Semaphore(config.max_concurrent_llm_calls)
+            if config.max_concurrent_llm_calls
+            else None
+        )
+
+    @property
+    def client(self) -> instructor.AsyncInstructor:
+        """The client passed in, else the shared one for the running loop."""
+        if self._client is not None:
+            return self._client
+        return self._get_client(self.config.model)
+
+    @classmethod
+    def _get_client(cls, model: str) -> instructor.AsyncInstructor:
+        """Return the async instructor client for a model on the running loop."""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # Nothing to share it with: a client is bound to its first loop
+            return instructor.from_provider(model, async_client=True)
+        clients = _CLIENT_CACHE.setdefault(loop, {})
+        client = clients.get(model)
+        if client is None:
+            client = instructor.from_provider(model, async_client=True)
+            clients[model] = client
+        return client
+
+    def with_metadata(self, metadata: Optional[Dict[str, any]] = None) -> "Agent[T]":
+        """
+        Return a shallow copy of this agent with different metadata.
+
+        The copy shares the config, tool registry, LLM client and cached tool
+        metadata, so long-running servers can build one agent at startup and
+        derive a per-request agent without re-creating the client.
+        """
+        agent = copy.copy(self)
+        agent.metadata = metadata or {}
+        return agent
 
     def set_response_model(self, response_model: Type[BaseModel]) -> None:
         """Set the response model for LLM calls."""
         self.response_model = response_model
-        logger.debug("Response model set", model=response_model.__name__)
+        self.log.debug("Response model set", model=response_model.__name__)
 
     def _format_tool_metadata(self) -> str:
         """Format tool metadata for inclusion in LLM prompts."""
-        if self._tool_metadata_cache is None:
-            tools_str = ""
-            for intent, tool_def in self.tool_registry.all_tool_defs.items():
-                tools_str += f"<tool> {tool_def.name} : {tool_def.description or 'No description'}</tool>\n"
-            self._tool_metadata_cache = tools_str.rstrip()
+        if (
+            self._tool_metadata_cache is None
+            or self._tool_metadata_version != self.tool_registry.version
+        ):
+            # Sorted so the prompt is identical across processes even when MCP
+            # servers register their tools in a different order
+            tool_defs = sorted(self.tool_registry.all_tool_defs.items())
+            self._tool_metadata_cache = "\n".join(
+                f"<tool> {tool_def.name} : {tool_def.description or 'No description'}</tool>"
+                for _, tool_def in tool_defs
+            )
+            self._tool_metadata_version = self.tool_registry.version
         return self._tool_metadata_cache
 
+    def _system_prompt(self) -> str:
+        """
+        Return the system prompt with tool metadata appended.
+
+        Rebuilt only when the base prompt or the tool registry changes, so the
+        system message is byte-identical across turns and provider-side prompt
+        caching can reuse it.
+        """
+        cached = self._system_prompt_cache
+        version = self.tool_registry.version
+        if (
+            cached is None
+            or cached[0] is not self.config.system_prompt
+            or cached[1] != version
+        ):
+            content = self.config.system_prompt
+            tool_metadata = self._format_tool_metadata()
+            if tool_metadata:
+                content += f"\nAvailable tools:\n{tool_metadata}"
+            cached = (
+                self.config.system_prompt,
+                version,
+                content,
+                estimate_tokens(content),
+            )
+            self._system_prompt_cache = cached
+        return cached[2]
+
+    def _system_prompt_tokens(self) -> int:
+        """Estimated tokens of _system_prompt(), computed when it is rebuilt."""
+        self._system_prompt()
+        return self._system_prompt_cache[3]
+
+    @property
+    def _provider(self) -> str:
+        """Provider prefix of the configured model, e.g. 'openai'."""
+        return self.config.model.split("/", 1)[0]
+
+    def _system_message(self, system_prompt: str) -> Dict:
+        """Return the system message for system_prompt, built once per prompt."""
+        return self._system_message_entry(system_prompt)[1]
+
+    def _request_options(self) -> Dict:
+        """Provider-specific create() options for the current system prompt."""
+        return self._system_message_entry(self._system_prompt())[2]
+
+    def _system_message_entry(self, system_prompt: str) -> Tuple[str, Dict, Dict]:
+        cached = self._system_message_cache
+        if cached is None or cached[0] is not system_prompt:
+            provider = self._provider
+            if provider in EXPLICIT_PROMPT_CACHE_PROVIDERS:
+                content = [
+                    {
+                        "type": "text",
+                        "text": system_prompt,
+                        "cache_control": {"type": "ephemeral"},
+                    }
+                ]
+            else:
+                content = system_prompt
+            options = {}
+            if provider in PROMPT_CACHE_KEY_PROVIDERS:
+                key = hashlib.sha256(system_prompt.encode()).hexdigest()[:32]
+                options["extra_body"] = {"prompt_cache_key": key}
+            cached = (system_prompt, {"role": "system", "content": content}, options)
+            self._system_message_cache = cached
+        return cached
+
     def _build_messages(
         self,
         prompt: str,
         thread: Optional[Thread] = None,
         context: Optional[str] = None,
+        max_thread_events: Optional[int] = None,
         **kwargs,
     ) -> List[Dict[str, str]]:
-        messages = [{"role": "system", "content": self.config.system_prompt}]
+        system_prompt = self._system_prompt()
+        messages = [self._system_message(system_prompt)]
 
-        # Add tool metadata
-        tool_metadata = self._format_tool_metadata()
-        if tool_metadata:
-            messages[0]["content"] += f"\nAvailable tools:\n{tool_metadata}"
-
-        # Add context if provided
+        # Add the user prompt, with any per-call context kept out of the
+        # system message so that prefix stays stable
         if context:
-            messages[0]["content"] += f"\n\nContext:\n{context}"
+            prompt = f"Context:\n{context}\n\n{prompt}"
 
         # Add conversation history if provided
         if thread:
-            for event in thread.events:
-                if event.type == "user_input":
-                    messages.append({"role": "user", "content": str(event.data)})
-                elif event.type == "llm_response":
-                    if "intent" in event.data:
-                        intent = event.data["intent"]
-                        if intent in ["done", "clarification"]:
-                            messages.append({"role": "assistant", "content": intent})
-                        else:
-                            tool_name = intent
-                            tool_args = event.data.get("arguments", {})
-                            messages.append(
-                                {
-                                    "role": "assistant",
-                                    "content": f"Selected tool '{tool_name}' with parameters: {tool_args}",
-                                }
-                            )
-                    else:
-                        messages.append(
-                            {"role": "assistant", "content": str(event.data)}
-                        )
-                elif event.type == "tool_response":
-                    response_data = event.data.get("response", "")
-                    content_for_llm = ""
-                    if (
-                        isinstance(response_data, dict)
-                        and "llm_content" in response_data
-                    ):
-                        content_for_llm = response_data["llm_content"]
-                    else:
-                        content_for_llm = str(response_data)
-
-                    messages.append(
+            since = 0
+            if max_thread_events:
+                since = max(len(thread.events) - max_thread_events, 0)
+            history = thread.llm_messages(since)
+            if self.config.max_context_tokens:
+                history = prune_to_token_budget(
+                    history,
+                    self.config.max_context_tokens
+                    - self._system_prompt_tokens()
+                    - estimate_tokens(prompt),
+                )
+            if history and self._provider in EXPLICIT_PROMPT_CACHE_PROVIDERS:
+                # Also mark the end of the history, so the next turn reads
+                # everything up to here from cache and only pays for new events
+                last = history[-1]
+                history[-1] = {
+                    "role": last["role"],
+                    "content": [
                         {
-                            "role": "user",
-                            "content": f"Tool execution result: {content_for_llm}",
+                            "type": "text",
+                            "text": last["content"],
+                            "cache_control": {"type": "ephemeral"},
                         }
-                    )
+                    ],
+                }
+            messages.extend(history)
 
-        # Add the user prompt
         messages.append({"role": "user", "content": prompt})
         return messages
 
@@ -132,31 +435,133 @@ class Agent(Generic[T]):
         self, messages: List[Dict[str, str]], response_model: Type[BaseModel]
     ) -> BaseModel:
         """Execute an LLM call with the given messages and response model."""
-        logger.info(
-            "LLM call", messages=messages, response_model=response_model.__name__
-        )
+        cache_key = None
+        if self.response_cache is not None and self.config.enable_response_cache:
+            cache_key = self._response_cache_key(messages, response_model)
+            cached = self.response_cache.get(cache_key)
+            if cached is not None and (
+                cached["expires_at"] is None or cached["expires_at"] > time.time()
+            ):
+                if self.log.isEnabledFor(logging.INFO):
+                    self.log.info(
+                        "LLM cache hit",
+                        response_model=response_model.__name__,
+                        tokens_saved=sum(_message_tokens(m) for m in messages),
+                    )
+                return response_model.model_validate_json(cached["response"])
+        self._log_llm_call("LLM call", messages, response_model)
         try:
-            response = await self.client.chat.completions.create(
-                response_model=response_model,
-                messages=messages,
-                temperature=0.0,
-            )
+            response = await self._create_with_retries(messages, response_model)
+            if cache_key is not None:
+                ttl = self.config.response_cache_ttl
+                self.response_cache.set(
+                    cache_key,
+                    {
+                        "response": response.model_dump_json(),
+                        "expires_at": time.time() + ttl if ttl is not None else None,
+                    },
+                )
             return response
         except Exception as e:
-            logger.error("LLM call failed", error=str(e), messages=messages)
+            self.log.error("LLM call failed", error=str(e), messages=messages)
             raise ValueError(f"LLM call failed: {str(e)}")
 
+    async def _create_with_retries(
+        self, messages: List[Dict[str, str]], response_model: Type[BaseModel]
+    ) -> BaseModel:
+        """Run the completion, retrying transient provider errors with backoff."""
+        attempt = 0
+        while True:
+            try:
+                async with self._llm_slot():
+                    return await self.client.chat.completions.create(
+                        response_model=response_model,
+                        messages=messages,
+                        temperature=0.0,
+                        **self._request_options(),
+                    )
+            except Exception as e:
+                retryable = _retryable_error(e)
+                if retryable is None or attempt >= self.config.llm_max_retries:
+                    raise
+                delay = _retry_delay(
+                    retryable, attempt, self.config.llm_retry_max_delay
+                )
+                self.log.warning(
+                    "LLM call failed, retrying",
+                    error=str(e),
+                    attempt=attempt + 1,
+                    delay=round(delay, 2),
+                )
+                await asyncio.sleep(delay)
+                attempt += 1
+
+    def _llm_slot(self):
+        """Context manager bounding concurrent LLM calls, if configured."""
+        return self._llm_semaphore or contextlib.nullcontext()
+
+    def _log_llm_call(
+        self,
+        event: str,
+        messages: List[Dict[str, str]],
+        response_model: Type[BaseModel],
+    ) -> None:
+        """Log call size at INFO; the full message bodies only at DEBUG."""
+        if self.log.isEnabledFor(logging.INFO):
+            self.log.info(
+                event,
+                response_model=response_model.__name__,
+                n_messages=len(messages),
+                last_role=messages[-1]["role"] if messages else None,
+                approx_tokens=sum(_message_tokens(message) for message in messages),
+            )
+        if self.log.isEnabledFor(logging.DEBUG):
+            self.log.debug(f"{event} messages", messages=messages)
+
+    def _response_cache_key(
+        self, messages: List[Dict[str, str]], response_model: Type[BaseModel]
+    ) -> str:
+        """Hash of everything that determines an LLM response."""
+        payload = orjson.dumps(
+            [self.config.model, messages], option=orjson.OPT_SORT_KEYS
+        )
+        digest = hashlib.sha256(payload)
+        digest.update(_response_model_fingerprint(response_model).encode())
+        return digest.hexdigest()
+
+    async def _call_llm_stream(
+        self, messages: List[Dict[str, str]], response_model: Type[BaseModel]
+    ) -> AsyncGenerator[BaseModel, None]:
+        """Stream partial responses as the LLM fills in the response model."""
+        self._log_llm_call("LLM stream", messages, response_model)
+        try:
+            async with self._llm_slot():
+                async for partial in self.client.chat.completions.create_partial(
+                    response_model=response_model,
+                    messages=messages,
+                    temperature=0.0,
+                    **self._request_options(),
+                ):
+                    yield partial
+        except Exception as e:
+            self.log.error("LLM stream failed", error=str(e), messages=messages)
+            raise ValueError(f"LLM call failed: {str(e)}")
+
+    def _needs_summarization(self, thread: Thread[T]) -> bool:
+        """Whether thread is over either summarization limit in the config."""
+        max_events = self.config.max_events_before_summarization
+        if max_events and len(thread.events) > max_events:
+            return True
+        max_tokens = self.config.max_history_tokens_before_summarization
+        return bool(max_tokens) and (
+            sum(_message_tokens(message) for message in thread.llm_messages())
+            > max_tokens
+        )
+
     async def summarize_thread_with_llm(self, thread: Thread[T], keep_last_n: int = 5):
         """
         Summarizes the thread's events using an LLM, replacing older events with a summary.
         """
-
-        class ContextSummary(BaseModel):
-            summary: str = Field(
-                ...,
-                description="A concise summary of the key facts, decisions, and outcomes from the conversation history.",
-            )
-
         summarization_prompt = "Summarize the key facts, decisions, and outcomes from the provided conversation history. Focus on information that will be relevant for future steps."
 
         # We pass the thread to run_llm, but we will handle adding the event manually.
@@ -168,12 +573,13 @@ class Agent(Generic[T]):
         )
 
         # Create a summary event
-        summary_event = {"type": "context_summary", "data": response.summary}
+        summary_event = Event(type="context_summary", data=response.summary)
 
-        # Keep the last N events and prepend the summary
-        recent_events = thread.events[-keep_last_n:]
-        thread.events = [summary_event] + recent_events
-        logger.info(
+        # Keep the last N events and prepend the summary. The retained Event
+        # objects keep their own rendered messages; the thread's caches are reset.
+        recent_events = thread.events[max(len(thread.events) - keep_last_n, 0) :]
+        thread.replace_events([summary_event, *recent_events])
+        self.log.info(
             "Thread has been summarized with LLM.", new_event_count=len(thread.events)
         )
 
@@ -185,30 +591,7 @@ class Agent(Generic[T]):
         add_event=True,
     ) -> BaseModel:
         """Select the next tool or terminal state using the LLM."""
-
-        # print(tuple(self.tool_registry.all_tool_defs.keys()))
-        valid_intents = (
-            list(self.tool_registry.all_tool_defs.keys()) if not tools else list(tools)
-        )
-        valid_intents += ["done", "clarification"]
-
-        # ToolLiteral = Literal[valid_intents] if valid_intents else str
-
-        class ToolSelection(BaseModel):
-            intent: str = Field(
-                ...,
-                description="The tool to use. Must be one of: "
-                + ", ".join(valid_intents),
-            )
-            reason: str
-
-            @model_validator(mode="after")
-            def check_intent(self) -> "ToolSelection":
-                if self.intent not in valid_intents:
-                    raise ValueError(
-                        f"Invalid tool selected: {self.intent}. Must be one of: {valid_intents}"
-                    )
-                return self
+        ToolSelection = self._tool_selection_model(tuple(tools) if tools else None)
 
         instruction = (
             "IMPORTANT: Only call tools when they are absolutely necessary. If the USER's task is general or you already know the answer, respond without calling tools. NEVER make redundant tool calls as these are very expensive."
@@ -228,7 +611,7 @@ class Agent(Generic[T]):
             add_event=False,
         )
         if add_event and thread:
-            thread.add_event(
+            thread.add_event_unchecked(
                 type="llm_response",
                 step="ToolSeclection",
                 data={
@@ -236,8 +619,7 @@ class Agent(Generic[T]):
                     "reason": response.reason,
                 },
             )
-        print(type(response), "---------")
-        logger.info("Tool selected", intent=response.intent)
+        self.log.info("Tool selected", intent=response.intent)
 
         if response.intent == "done":
             return DoneForNow(message="Task completed by agent.")
@@ -247,6 +629,185 @@ class Agent(Generic[T]):
             )
         return response
 
+    def _sync_tool_models(self) -> None:
+        """Drop generated tool models if the registry changed since they were built."""
+        if self._tool_models_version != self.tool_registry.version:
+            self._tool_selection_models = {}
+            self._param_models = {}
+            self._tool_decision_models = {}
+            self._tool_models_version = self.tool_registry.version
+
+    def _tool_selection_model(
+        self, tools: Optional[Tuple[str, ...]] = None
+    ) -> Type[BaseModel]:
+        """
+        Return the select_tool response model for the given tools (default: all).
+
+        `intent` is a Literal over the tool names plus 'done' and
+        'clarification', so the schema sent to the LLM enumerates valid choices.
+        """
+        self._sync_tool_models()
+        if tools is None:
+            tools = tuple(self.tool_registry.all_tool_defs)
+        model = self._tool_selection_models.get(tools)
+        if model is None:
+            valid_intents = tools + ("done", "clarification")
+            model = create_model(
+                "ToolSelection",
+                intent=(
+                    Literal[valid_intents],
+                    Field(
+                        ...,
+                        description="The tool to use. Must be one of: "
+                        + ", ".join(valid_intents),
+                    ),
+                ),
+                reason=(str, ...),
+            )
+            self._tool_selection_models[tools] = model
+        return model
+
+    def _param_model(self, intent: str) -> Type[BaseModel]:
+        """Return the parameter model for a tool, created once per registry version."""
+        self._sync_tool_models()
+        model = self._param_models.get(intent)
+        if model is None:
+            tool_def = self.tool_registry.all_tool_defs[intent]
+            model = create_model_from_tool_schema(tool_def)
+            self._param_models[intent] = model
+        return model
+
+    def _tool_decision_model(self, parallel: bool = False) -> Type[BaseModel]:
+        """
+        Return a response model that selects a tool and fills its arguments.
+
+        `decision` is a union discriminated by `intent`: one member per tool,
+        carrying that tool's parameter model as `arguments`, plus the 'done'
+        and 'clarification' terminal states. With parallel=True the model has
+        a `decisions` list instead. Rebuilt when the registry changes.
+        """
+        self._sync_tool_models()
+        model = self._tool_decision_models.get(parallel)
+        if model is None:
+            members = [
+                create_model(
+                    re.sub(r"\W", "_", intent) + "_Decision",
+                    intent=(Literal[intent], ...),
+                    reason=(str, ...),
+                    arguments=(self._param_model(intent), ...),
+                )
+                for intent in self.tool_registry.all_tool_defs
+            ]
+            members += [
+                create_model(
+                    f"{terminal}_Decision",
+                    intent=(Literal[terminal], ...),
+                    reason=(str, ...),
+                )
+                for terminal in ("done", "clarification")
+            ]
+            decision = Annotated[Union[tuple(members)], Field(discriminator="intent")]
+            if parallel:
+                model = create_model(
+                    "ToolDecisions",
+                    decisions=(
+                        List[decision],
+                        Field(
+                            ...,
+                            description="Independent tool calls to run together, "
+                            "or a single 'done' or 'clarification'.",
+                        ),
+                    ),
+                )
+            else:
+                model = create_model("ToolDecision", decision=(decision, ...))
+            self._tool_decision_models[parallel] = model
+        return model
+
+    async def decide_tool(
+        self,
+        thread: Optional[Thread[T]] = None,
+        context: Optional[str] = None,
+        add_event: bool = True,
+    ) -> Tuple[BaseModel, Optional[Dict[str, any]]]:
+        """
+        Select the next tool and fill its arguments with a single LLM call.
+
+        Returns (selection, arguments): selection is DoneForNow or
+        ClarificationRequest for terminal states (with arguments None),
+        otherwise the decision with `intent` and `reason`.
+        """
+        response = await self.run_llm(
+            DECIDE_TOOL_INSTRUCTION,
+            thread=thread,
+            context=context,
+            response_model=self._tool_decision_model(),
+            add_event=False,
+        )
+        return self._record_decision(response.decision, thread, add_event)
+
+    async def decide_tools(
+        self,
+        thread: Optional[Thread[T]] = None,
+        context: Optional[str] = None,
+        add_event: bool = True,
+    ) -> List[Tuple[BaseModel, Optional[Dict[str, any]]]]:
+        """
+        Like decide_tool, but the LLM may select several independent tools.
+
+        Returns a list of (selection, arguments) pairs: the tool calls if
+        any were selected, otherwise a single terminal selection.
+        """
+        decisions = await self._decide_tool_calls(thread, context)
+        return self._record_decisions(decisions, thread, add_event)
+
+    async def _decide_tool_calls(
+        self, thread: Optional[Thread[T]], context: Optional[str]
+    ) -> List[BaseModel]:
+        """The LLM's tool call decisions, or at most one terminal decision."""
+        response = await self.run_llm(
+            DECIDE_TOOL_INSTRUCTION
+            + " If several independent tools are needed now, select all of them.",
+            thread=thread,
+            context=context,
+            response_model=self._tool_decision_model(parallel=True),
+            add_event=False,
+        )
+        decisions = response.decisions
+        tool_calls = [d for d in decisions if d.intent not in ("done", "clarification")]
+        return tool_calls or decisions[:1]
+
+    def _record_decisions(
+        self, decisions: List[BaseModel], thread: Optional[Thread[T]], add_event: bool
+    ) -> List[Tuple[BaseModel, Optional[Dict[str, any]]]]:
+        """_record_decision for each decision; no decision at all means done."""
+        if not decisions:
+            return [(DoneForNow(message="Task completed by agent."), None)]
+        return [self._record_decision(d, thread, add_event) for d in decisions]
+
+    def _record_decision(
+        self, decision: BaseModel, thread: Optional[Thread[T]], add_event: bool
+    ) -> Tuple[BaseModel, Optional[Dict[str, any]]]:
+        """Log a ToolDecision member and map it to (selection, arguments)."""
+        if add_event and thread:
+            thread.add_event_unchecked(
+                type="llm_response",
+                step="ToolSeclection",
+                data={"intent": decision.intent, "reason": decision.reason},
+            )
+        self.log.info("Tool selected", intent=decision.intent)
+
+        if decision.intent == "done":
+            return DoneForNow(message="Task completed by agent."), None
+        if decision.intent == "clarification":
+            return (
+                ClarificationRequest(
+                    message=f"Clarification needed for : {decision.reason}"
+                ),
+                None,
+            )
+        return decision, decision.arguments.model_dump()
+
     async def fill_parameters(
         self,
         intent: str,
@@ -260,10 +821,34 @@ class Agent(Generic[T]):
         """
         tool_def = self.tool_registry.all_tool_defs.get(intent)
         if not tool_def:
-            logger.error("Tool not found", intent=intent)
+            self.log.error("Tool not found", intent=intent)
             raise ValueError(f"Tool {intent} not found")
 
-        ToolParamsModel = create_model_from_tool_schema(tool_def)
+        if not tool_needs_arguments(tool_def):
+            # Nothing to fill: every parameter is optional with a default
+            arguments = {}
+        else:
+            arguments = await self._generate_arguments(intent, thread, context)
+
+        if add_event and thread is not None:
+            thread.add_event_unchecked(
+                type="llm_response",
+                data={"intent": intent, "arguments": arguments},
+                step="llm_parameters",
+            )
+
+        self.log.info("Tool parameters filled", intent=intent)
+        return arguments
+
+    async def _generate_arguments(
+        self,
+        intent: str,
+        thread: Optional[Thread[T]] = None,
+        context: Optional[str] = None,
+    ) -> Dict[str, any]:
+        """Ask the LLM for a tool's arguments."""
+        tool_def = self.tool_registry.all_tool_defs[intent]
+        ToolParamsModel = self._param_model(intent)
         instruction = (
             f"You have selected the tool: {tool_def.name}.\n"
             f"Description: {tool_def.description}\n"
@@ -281,49 +866,62 @@ class Agent(Generic[T]):
             add_event=False,
         )
 
-        arguments = {
-            param_name: getattr(param_response, param_name)
-            for param_name in tool_def.parameters_json_schema.get(
-                "properties", {}
-            ).keys()
-            if hasattr(param_response, param_name)
-        }
-
-        if add_event and thread is not None:
-            thread.add_event(
-                type="llm_response",
-                data={"intent": intent, "arguments": arguments},
-                step="llm_parameters",
-            )
-
-        logger.info("Tool parameters filled", intent=intent)
-        return arguments
+        # The parameter model has exactly the schema's properties as fields,
+        # so one pydantic-core dump replaces per-property getattr calls.
+        return param_response.model_dump()
 
     async def _generate_final_response(self, thread: Thread[T]) -> FinalResponse:
         """Generate a final response summarizing the results for the user."""
-        instruction = (
-            "Based on the conversation history and tool execution results, "
-            "provide a clear and concise response to the user's original request. "
-            "Summarize the key findings or results in a user-friendly way."
-        )
         response = await self.run_llm(
-            instruction,
+            FINAL_RESPONSE_INSTRUCTION,
             thread=thread,
             response_model=FinalResponse,
             add_event=False,  # Don't add 'llm_response' event
         )
-        # Collect all tool results
-        tool_results = {}
+        return self._record_final_response(thread, response)
+
+    async def stream_final_response(
+        self, thread: Thread[T]
+    ) -> AsyncGenerator[FinalResponse, None]:
+        """
+        Like the final response step of agent_loop, but yields partial
+        responses as the message arrives so callers can show it early.
+
+        The last value yielded is the complete FinalResponse, with raw_results,
+        which is also added to the thread.
+        """
+        messages = self._build_messages(FINAL_RESPONSE_INSTRUCTION, thread)
+        started = time.perf_counter()
+        partial = None
+        async for partial in self._call_llm_stream(messages, FinalResponse):
+            if started is not None:
+                self.log.info(
+                    "Final response first token",
+                    ttft=round(time.perf_counter() - started, 3),
+                )
+                started = None
+            yield partial
+        if partial is not None:
+            yield self._record_final_response(thread, partial)
+
+    def _record_final_response(
+        self, thread: Thread[T], response: BaseModel
+    ) -> FinalResponse:
+        """Attach the thread's tool results to response and log it as an event."""
+        # Collect every tool response and user input, in order
+        tool_results = {"tool_responses": [], "user_inputs": []}
         for event in thread.events:
-            if event.type == "tool_response" or event.type == "user_input":
-                tool_results[event.type] = event.data
+            if event.type == "tool_response":
+                tool_results["tool_responses"].append(event.data)
+            elif event.type == "user_input":
+                tool_results["user_inputs"].append(event.data)
 
         final_response = FinalResponse(
             message=response.message, summary=response.summary, raw_results=tool_results
         )
 
         # Add a 'final_response' event to the thread
-        thread.add_event(
+        thread.add_event_unchecked(
             type="llm_response",
             data=final_response.model_dump(exclude_none=True),
             step="final_reponse",
@@ -343,70 +941,175 @@ class Agent(Generic[T]):
         executing tools and updating the thread with events. This is an async generator
         that yields the thread state after each significant step.
         """
-        logger.info(
-            "Starting agent loop",
-            thread_id=thread.thread_id,
-        )
-
-        if (
-            self.config.max_events_before_summarization
-            and len(thread.events) > self.config.max_events_before_summarization
-        ):
-            await self.summarize_thread_with_llm(thread)
+        log = self.log.bind(thread_id=thread.thread_id)
+        log.info("Starting agent loop")
 
         yield thread  # Yield initial state
 
-        while True:
-            # Step 1: Select tool or terminal state
-            selection = await self.select_tool(
-                tools=None, thread=thread, context=context
-            )
-            yield thread  # Yield after tool selection
-
-            # Step 2: Handle terminal states
-            if isinstance(selection, DoneForNow):
-                final_response = await self._generate_final_response(thread)
-                logger.info("Final response generated", response=final_response.message)
-                yield thread
-                return  # End of loop
-
-            if isinstance(selection, ClarificationRequest):
-                logger.info("Agent loop exiting: clarification needed")
-                yield thread
-                return  # End of loop
-
-            # Step 2.5: Check for confirmation if it's a BaseTool
-            tool_to_execute = self.tool_registry.local_tools.get(selection.intent)
-            arguments = await self.fill_parameters(
-                selection.intent, thread, add_event=False
-            )
+        # Side-effect-only tool calls still running; awaited before the loop ends
+        background: List[asyncio.Task] = []
+        try:
+            while True:
+                # Compact a long history before it is sent again
+                if self._needs_summarization(thread):
+                    await self.summarize_thread_with_llm(thread)
+
+                # Step 1: Select tool or terminal state (in one call, its arguments)
+                if self.config.two_stage_toolcall:
+                    selection = await self.select_tool(
+                        tools=None, thread=thread, context=context
+                    )
+                    selections = [(selection, None)]
+                elif self.config.parallel_tool_calls:
+                    decisions = await self._decide_tool_calls(thread, context)
+                    # Several independent tools run together unless one needs
+                    # confirmation; then only the first goes ahead, and only
+                    # the selections that will run are added to the thread
+                    if len(decisions) > 1 and any(
+                        self._needs_confirmation(d.intent, d.arguments.model_dump())
+                        for d in decisions
+                    ):
+                        log.info("Confirmation needed; running the first tool only")
+                        decisions = decisions[:1]
+                    selections = self._record_decisions(decisions, thread, True)
+                else:
+                    selections = [
+                        await self.decide_tool(thread=thread, context=context)
+                    ]
+                selection, arguments = selections[0]
+                yield thread  # Yield after tool selection
+
+                # Several independent tools: run them together
+                if len(selections) > 1:
+                    calls = [(s.intent, a) for s, a in selections]
+                    for intent, tool_args in calls:
+                        thread.add_event_unchecked(
+                            type="llm_response",
+                            data={"intent": intent, "arguments": tool_args},
+                            step="llm_parameters",
+                        )
+                    yield thread
+                    log.debug("Executing tool calls", intents=[c[0] for c in calls])
+                    await self._execute_tools_concurrently(calls, thread)
+                    yield thread
+                    continue
+
+                # Step 2: Handle terminal states
+                if isinstance(selection, DoneForNow):
+                    final_response = await self._generate_final_response(thread)
+                    log.info(
+                        "Final response generated", response=final_response.message
+                    )
+                    yield thread
+                    return  # End of loop
+
+                if isinstance(selection, ClarificationRequest):
+                    log.info("Agent loop exiting: clarification needed")
+                    yield thread
+                    return  # End of loop
+
+                # Step 2.5: Check for confirmation if it's a BaseTool
+                tool_to_execute = self.tool_registry.local_tools.get(selection.intent)
+                if arguments is None:
+                    arguments = await self.fill_parameters(
+                        selection.intent, thread, add_event=False
+                    )
 
-            if isinstance(tool_to_execute, BaseTool) and tool_to_execute.should_confirm(
-                arguments
-            ):
-                confirmation_prompt = tool_to_execute.get_confirmation_prompt(
-                    arguments
-                )
-                thread.add_event(
-                    type="clarification",
-                    data={"message": confirmation_prompt, "intent": "clarification"},
+                if self._needs_confirmation(selection.intent, arguments):
+                    confirmation_prompt = tool_to_execute.get_confirmation_prompt(
+                        arguments
+                    )
+                    thread.add_event_unchecked(
+                        type="clarification",
+                        data={
+                            "message": confirmation_prompt,
+                            "intent": "clarification",
+                        },
+                    )
+                    log.info(
+                        "Agent loop exiting: confirmation needed",
+                        prompt=confirmation_prompt,
+                    )
+                    yield thread
+                    return  # Pause the loop for user confirmation
+
+                # Step 3: Log the parameters filled above for the selected tool
+                thread.add_event_unchecked(
+                    type="llm_response",
+                    data={"intent": selection.intent, "arguments": arguments},
+                    step="llm_parameters",
                 )
-                logger.info(
-                    "Agent loop exiting: confirmation needed", prompt=confirmation_prompt
+                yield thread  # Yield after params are filled
+
+                # Step 4: Execute the tool; side-effect-only tools run in the
+                # background while the agent plans its next step
+                if (
+                    isinstance(tool_to_execute, BaseTool)
+                    and tool_to_execute.side_effect_only
+                ):
+                    log.debug(
+                        "Starting background tool call", intent=selection.intent
+                    )
+                    thread.add_event_unchecked(
+                        type="tool_call",
+                        data={"intent": selection.intent, "arguments": arguments},
+                    )
+                    background.append(
+                        asyncio.create_task(
+                            self.tool_registry.execute_tool(selection.intent, arguments)
+                        )
+                    )
+                    thread.add_event_unchecked(
+                        type="tool_response",
+                        data={
+                            "response": "Started in the background.",
+                            "source": "ToolRegistry",
+                        },
+                    )
+                    yield thread
+                    continue
+
+                log.debug("Executing tool call", intent=selection.intent)
+                result = await self.execute_tool(
+                    selection.intent, arguments, thread=thread, add_event=True
                 )
-                yield thread
-                return  # Pause the loop for user confirmation
+                yield thread  # Yield after tool execution
+        finally:
+            await self._finish_background_tools(background)
+
+    async def _finish_background_tools(self, tasks: List[asyncio.Task]) -> None:
+        """Wait for background tool calls and log any that failed."""
+        if not tasks:
+            return
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        for result in results:
+            if isinstance(result, Exception):
+                self.log.error("Background tool execution failed", error=str(result))
+
+    async def arun_many(
+        self,
+        threads: List[Thread[T]],
+        max_concurrency: int = 8,
+        context: Optional[str] = None,
+    ) -> List[Union[Thread[T], Exception]]:
+        """
+        Run agent_loop on independent threads concurrently.
+
+        At most max_concurrency loops run at once. Results are in input order;
+        a thread whose loop raised is returned as the exception so one failure
+        does not discard the other results.
+        """
+        semaphore = asyncio.Semaphore(max_concurrency)
 
-            # Step 3: Fill parameters for the selected tool (and log the event)
-            await self.fill_parameters(selection.intent, thread, add_event=True)
-            yield thread  # Yield after params are filled and tool_call is formulated
+        async def run_one(thread: Thread[T]) -> Thread[T]:
+            async with semaphore:
+                async for _ in self.agent_loop(thread, context=context):
+                    pass
+            return thread
 
-            # Step 4: Execute the tool
-            logger.debug("Executing tool call", intent=selection.intent)
-            result = await self.execute_tool(
-                selection.intent, arguments, thread=thread, add_event=True
-            )
-            yield thread  # Yield after tool execution
+        return await asyncio.gather(
+            *(run_one(thread) for thread in threads), return_exceptions=True
+        )
 
     async def run_llm(
         self,
@@ -419,42 +1122,111 @@ class Agent(Generic[T]):
         step=None,
         **kwargs,
     ) -> BaseModel:
-        # Apply pruning if specified
-        if max_thread_events and thread:
-            thread.events = thread.events[-max_thread_events:]
-
-        messages = self._build_messages(prompt, thread, context, **kwargs)
-        logger.info(
-            "LLM call",
-            messages=messages,
-            response_model=response_model.__name__ if response_model else "text",
+        # Only the last max_thread_events events are sent; the thread itself
+        # keeps its full history.
+        messages = self._build_messages(
+            prompt, thread, context, max_thread_events=max_thread_events, **kwargs
         )
         try:
             # Use provided response_model or default
-            class Response(BaseModel):
-                response: str
-
             model_to_use = response_model or Response
             response = await self._call_llm(messages, model_to_use)
 
             if thread is not None and add_event:
-                if step != None:
-                    thread.add_event(
-                        type="llm_response",
-                        data=response.model_dump(exclude_none=True),
-                        step=step,
-                    )
-                else:
-                    thread.add_event(
-                        type="llm_response", data=response.model_dump(exclude_none=True)
-                    )
+                thread.add_event_unchecked(
+                    type="llm_response",
+                    data=response.model_dump(exclude_none=True),
+                    step=step,
+                )
 
             # Return the response
             return response
         except Exception as e:
-            logger.error("LLM call failed", error=str(e), messages=messages)
+            self.log.error("LLM call failed", error=str(e), messages=messages)
             raise ValueError(f"LLM call failed: {str(e)}")
 
+    async def stream_llm(
+        self,
+        prompt: str,
+        response_model: Type[BaseModel],
+        thread: Optional[Thread] = None,
+        context: Optional[str] = None,
+        add_event: bool = True,
+        step=None,
+    ) -> AsyncGenerator[BaseModel, None]:
+        """
+        Like run_llm, but yields partial responses as fields arrive so callers
+        can show output before the full response is complete.
+
+        Partial values have every field optional; the last one yielded is the
+        complete response, which is logged to the thread if add_event is set.
+        """
+        messages = self._build_messages(prompt, thread, context)
+        partial = None
+        async for partial in self._call_llm_stream(messages, response_model):
+            yield partial
+        if partial is not None and thread is not None and add_event:
+            thread.add_event_unchecked(
+                type="llm_response",
+                data=partial.model_dump(exclude_none=True),
+                step=step,
+            )
+
+    def _needs_confirmation(self, intent: str, arguments: Dict[str, any]) -> bool:
+        """Whether a local BaseTool asks for user confirmation of these arguments."""
+        tool = self.tool_registry.local_tools.get(intent)
+        return isinstance(tool, BaseTool) and tool.should_confirm(arguments)
+
+    async def _execute_tools_concurrently(
+        self, calls: List[Tuple[str, Dict[str, any]]], thread: Thread[T]
+    ) -> None:
+        """
+        Execute independent tool calls concurrently.
+
+        Events are added in call order once all calls finish, so each
+        tool_response follows its own tool_call. As in execute_tool, a failed
+        call keeps its tool_call without a response; the first failure is
+        raised after every call is recorded.
+        """
+
+        async def run(intent: str, arguments: Dict[str, any]) -> any:
+            async with self._tool_semaphore:
+                return await self.tool_registry.execute_tool(intent, arguments)
+
+        results = await asyncio.gather(
+            *(run(intent, arguments) for intent, arguments in calls),
+            return_exceptions=True,
+        )
+        error = None
+        for (intent, arguments), result in zip(calls, results):
+            thread.add_event_unchecked(
+                type="tool_call", data={"intent": intent, "arguments": arguments}
+            )
+            if isinstance(result, BaseException):
+                self.log.error("Tool execution failed", tool=intent, error=str(result))
+                error = error or result
+                continue
+            thread.add_event_unchecked(
+                type="tool_response",
+                data={
+                    "response": self._serialize_tool_result(result),
+                    "source": "ToolRegistry",
+                },
+            )
+            self.log.info("Tool execution completed", tool=intent)
+        if error is not None:
+            raise error
+
+    def _serialize_tool_result(self, result: any) -> any:
+        """Convert a tool result into event data."""
+        if isinstance(result, ToolResult):
+            return {
+                "llm_content": result.llm_content,
+                "display_content": serialize_mcp_result(result.display_content),
+                "raw_result": serialize_mcp_result(result.raw_result),
+            }
+        return serialize_mcp_result(result)
+
     async def execute_tool(
         self,
         tool_name: str,
@@ -469,7 +1241,7 @@ class Agent(Generic[T]):
         try:
             # Log tool call event if requested
             if add_event and thread is not None:
-                thread.add_event(
+                thread.add_event_unchecked(
                     type="tool_call", data={"intent": tool_name, "arguments": arguments}
                 )
 
@@ -477,25 +1249,18 @@ class Agent(Generic[T]):
             result = await self.tool_registry.execute_tool(tool_name, arguments)
 
             # Handle ToolResult or serialize other results
-            if isinstance(result, ToolResult):
-                serialized_result = {
-                    "llm_content": result.llm_content,
-                    "display_content": serialize_mcp_result(result.display_content),
-                    "raw_result": serialize_mcp_result(result.raw_result),
-                }
-            else:
-                serialized_result = serialize_mcp_result(result)
+            serialized_result = self._serialize_tool_result(result)
 
             # Log tool response event if requested
             if add_event and thread is not None:
-                thread.add_event(
+                thread.add_event_unchecked(
                     type="tool_response",
                     data={"response": serialized_result, "source": "ToolRegistry"},
                 )
 
-            logger.info("Tool execution completed", tool=tool_name)
+            self.log.info("Tool execution completed", tool=tool_name)
             return result
 
         except Exception as e:
-            logger.error("Tool execution failed", tool=tool_name, error=str(e))
+            self.log.error("Tool execution failed", tool=tool_name, error=str(e))
             raise
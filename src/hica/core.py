@@ -2,15 +2,14 @@
 Thread is working memory of the agent.
 """
 
-import json
 import uuid
-import xml.etree.ElementTree as ET
-from typing import Any, Dict, Generic, List, TypeVar
+from typing import Any, BinaryIO, Dict, Generic, List, Optional, TypeVar, Union
 
-from pydantic import BaseModel, Field
+import orjson
+from pydantic import BaseModel, Field, PrivateAttr, ValidationError
 
 from .logging import logger
-from .models import Event
+from .models import TOOL_RESULT_PREFIX, Event
 
 T = TypeVar("T")
 
@@ -20,41 +19,48 @@ class Thread(BaseModel, Generic[T]):
     events: List[Event] = Field(default_factory=list)
     metadata: Dict[str, Any] = Field(default_factory=dict)
 
+    # JSON-ready dumps of self.events, kept in step by append_event so API
+    # responses only serialize events they have not seen yet.
+    _serialized_events: List[Dict[str, Any]] = PrivateAttr(default_factory=list)
+    _serialized_tail: Optional[Event] = PrivateAttr(default=None)
+    # Chat messages rendered from self.events (None for events not sent to the
+    # LLM), kept in step the same way so each LLM call only renders new events.
+    _llm_messages: List[Optional[Dict[str, str]]] = PrivateAttr(default_factory=list)
+    _llm_messages_tail: Optional[Event] = PrivateAttr(default=None)
+    # Bumped whenever the event list is rewritten rather than appended to
+    _events_version: int = PrivateAttr(default=0)
+
     def serialize_for_llm(self, format: str = "json") -> str:
         """Serialize thread for LLM consumption, excluding redundant events."""
-        context_summary = (
-            f"Thread Context: {json.dumps(self.metadata)}\n\n" if self.metadata else ""
-        )
+        context_summary = ""
+        if self.metadata:
+            metadata = orjson.dumps(self.metadata, default=str).decode()
+            context_summary = f"Thread Context: {metadata}\n\n"
 
         # Filter out llm_prompt events and only include relevant events
-        relevant_events = []
-        for event in self.events:
-            if event.type not in ["llm_prompt"]:  # Exclude llm_prompt events
-                relevant_events.append(event)
-
-        events_str = (
-            "\n".join(self.serialize_one_event(event) for event in relevant_events)
-            if format == "xml"
-            else json.dumps([event.dict() for event in relevant_events], indent=2)
-        )
+        if format == "xml":
+            events_str = "\n".join(
+                event.rendered_xml
+                for event in self.events
+                if event.type not in ["llm_prompt"]
+            )
+        else:
+            # Reuse the cached per-event dumps rather than dumping every event
+            relevant_events = [
+                dump
+                for event, dump in zip(self.events, self.serialized_events())
+                if event.type not in ["llm_prompt"]
+            ]
+            events_str = orjson.dumps(
+                relevant_events, option=orjson.OPT_INDENT_2
+            ).decode()
         return f"{context_summary}{events_str}"
 
     def serialize_one_event(self, event: Event) -> str:
-        root = ET.Element(
-            event.data.get("intent", event.type)
-            if isinstance(event.data, dict)
-            else event.type
-        )
-        if isinstance(event.data, (str, float, int)):
-            root.text = str(event.data)
-        elif isinstance(event.data, dict):
-            for key, value in event.data.items():
-                if key != "intent":
-                    child = ET.SubElement(root, key)
-                    child.text = str(value)
-        return ET.tostring(root, encoding="unicode", method="xml")
+        return event.rendered_xml
 
     def awaiting_human_response(self) -> bool:
+        """Whether the last event is a clarification request (O(1), no scan)."""
         if not self.events:
             return False
         last_event = self.events[-1]
@@ -80,7 +86,7 @@ class Thread(BaseModel, Generic[T]):
         could use an LLM to create a summary of the truncated events.
         """
         if len(self.events) > max_events:
-            self.events = self.events[-max_events:]
+            self.replace_events(self.events[-max_events:])
             logger.info(
                 "Context summarized by truncation",
                 remaining_events=len(self.events),
@@ -104,19 +110,58 @@ class Thread(BaseModel, Generic[T]):
         """Serialize Thread to JSON string."""
         return self.model_dump_json(exclude_none=True, indent=2)
 
+    def write_json(self, fp: BinaryIO) -> None:
+        """
+        Write the thread as JSON to a binary file, one event at a time.
+
+        Events come from the serialized_events() cache, so only events added
+        since the last write are dumped, and no full JSON string is built.
+        The result loads with from_json and from_json_trusted.
+        """
+        fp.write(b'{"thread_id":' + orjson.dumps(self.thread_id) + b',"events":[')
+        for i, event in enumerate(self.serialized_events()):
+            if i:
+                fp.write(b",")
+            fp.write(orjson.dumps(event))
+        fp.write(b'],"metadata":' + orjson.dumps(self.metadata, default=str) + b"}")
+
     @classmethod
     def from_json(cls, json_str: str) -> "Thread":
         """Deserialize Thread from JSON string."""
         try:
-            data = json.loads(json_str)
-            return cls(**data)
-        except json.JSONDecodeError as e:
-            logger.error("Failed to deserialize Thread from JSON", error=str(e))
-            raise ValueError(f"Invalid JSON: {e}")
+            # Parse and validate the thread and all its events in one
+            # pydantic-core pass instead of json.loads + per-field validation.
+            return cls.model_validate_json(json_str)
+        except ValidationError as e:
+            if any(error["type"] == "json_invalid" for error in e.errors()):
+                logger.error("Failed to deserialize Thread from JSON", error=str(e))
+                raise ValueError(f"Invalid JSON: {e}")
+            logger.error("Unexpected error deserializing Thread", error=str(e))
+            raise
         except Exception as e:
             logger.error("Unexpected error deserializing Thread", error=str(e))
             raise
 
+    @classmethod
+    def from_json_trusted(cls, json_str: Union[str, bytes]) -> "Thread":
+        """
+        Deserialize a Thread this package serialized itself, skipping validation.
+
+        Use only for data written by to_json (e.g. a memory store's own files);
+        external input should go through from_json.
+        """
+        return cls.from_dict_trusted(orjson.loads(json_str))
+
+    @classmethod
+    def from_dict_trusted(cls, data: Dict[str, Any]) -> "Thread":
+        """from_json_trusted for already parsed data; consumes data."""
+        # to_json drops None values, so a None data field comes back missing
+        events = [
+            Event.model_construct(data=event.pop("data", None), **event)
+            for event in data.pop("events", [])
+        ]
+        return cls.model_construct(events=events, **data)
+
     def add_event(self, type: str, data: Any, step: str = None) -> None:
         """
         Add an event to the thread.
@@ -130,4 +175,123 @@ class Thread(BaseModel, Generic[T]):
             thread.add_event('tool_call', {'intent': 'add', 'arguments': {'a': 2, 'b': 3}}, step='addition')
         """
         event = Event(type=type, step=step, data=data)
+        self.append_event(event)
+
+    def add_event_unchecked(self, type: str, data: Any, step: str = None) -> None:
+        """
+        Like add_event, but builds the Event without pydantic validation.
+
+        For trusted internal callers (the agent loop) whose data is already
+        plain JSON-compatible values; use add_event for anything else.
+        """
+        self.append_event(Event.model_construct(type=type, step=step, data=data))
+
+    def append_event(self, event: Event) -> None:
+        """Append an already constructed Event and cache its serialized form."""
+        self.serialized_events(len(self.events))  # sync the cache first
         self.events.append(event)
+        self._serialized_events.append(event.model_dump(mode="json"))
+        self._serialized_tail = event
+
+    def snapshot(self) -> "Thread[T]":
+        """
+        Copy with its own event list, metadata and caches, sharing the Events.
+
+        The copy can be serialized in another OS thread while this thread keeps
+        changing; it keeps the cached dumps and events_version of the original.
+        """
+        copy = self.model_copy(
+            update={"events": list(self.events), "metadata": dict(self.metadata)}
+        )
+        copy._serialized_events = list(self._serialized_events)
+        copy._llm_messages = list(self._llm_messages)
+        return copy
+
+    @property
+    def events_version(self) -> int:
+        """Counter bumped by replace_events, for callers that cache by position."""
+        return self._events_version
+
+    def replace_events(self, events: List[Event]) -> None:
+        """
+        Replace the event list in place and drop every cache derived from it.
+
+        Use this instead of editing self.events when events are removed or
+        reordered: the per-event caches only detect appends and truncations,
+        not a rewrite that happens to keep the same length and last event.
+        """
+        self.events[:] = events
+        self._serialized_events.clear()
+        self._serialized_tail = None
+        self._llm_messages.clear()
+        self._llm_messages_tail = None
+        self._events_version += 1
+
+    def serialized_events(self, since: int = 0) -> List[Dict[str, Any]]:
+        """
+        Return JSON-ready dicts for events[since:].
+
+        Dumps are cached, so repeated calls only serialize events appended since
+        the last call. The cache is rebuilt if the event list was replaced or
+        truncated (e.g. by summarize_context).
+        """
+        cache = self._serialized_events
+        if self._cache_is_stale(cache, self._serialized_tail):
+            cache.clear()
+        for event in self.events[len(cache) :]:
+            cache.append(event.model_dump(mode="json"))
+        self._serialized_tail = self.events[-1] if self.events else None
+        return cache[since:]
+
+    def llm_messages(self, since: int = 0) -> List[Dict[str, str]]:
+        """
+        Return the chat messages for this thread's history from events[since:].
+
+        Messages come from each event's cached rendered_message, so later calls
+        only touch events appended since, with the same rebuild rules as
+        serialized_events; a rebuild (after truncation) re-renders nothing.
+
+        A tool step (the messages after the last user message or tool result,
+        up to and including the next tool result) that exactly repeats the
+        step before it is sent only once, with "(repeated N times)" appended to
+        its tool result, so repeated identical tool calls add few input tokens
+        but the model can still see that it is looping.
+        """
+        cache = self._llm_messages
+        if self._cache_is_stale(cache, self._llm_messages_tail):
+            cache.clear()
+        for event in self.events[len(cache) :]:
+            cache.append(event.rendered_message)
+        self._llm_messages_tail = self.events[-1] if self.events else None
+
+        messages: List[Dict[str, str]] = []
+        step_start, previous_step, repeats = 0, None, 1
+        for message in cache[since:]:
+            if message is None:
+                continue
+            messages.append(message)
+            if message["role"] != "user":
+                continue
+            if message["content"].startswith(TOOL_RESULT_PREFIX):
+                step = messages[step_start:]
+                if step == previous_step:
+                    del messages[step_start:]
+                    repeats += 1
+                    # A new dict: the cached rendered message stays unchanged
+                    messages[-1] = {
+                        **message,
+                        "content": f"{message['content']} (repeated {repeats} times)",
+                    }
+                    continue
+                previous_step, repeats = step, 1
+            else:
+                # New user input: a following identical step is not a repeat
+                previous_step = None
+            step_start = len(messages)
+        return messages
+
+    def _cache_is_stale(self, cache: list, tail: Optional[Event]) -> bool:
+        """Whether a per-event cache no longer matches a prefix of self.events."""
+        return bool(cache) and (
+            len(cache) > len(self.events) or self.events[len(cache) - 1] is not tail
+        )
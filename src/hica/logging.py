@@ -1,13 +1,106 @@
+import atexit
 import logging
+import logging.handlers
 import os
+import queue
+import re
 import sys
-from typing import Any, Dict
+from collections import OrderedDict
+from typing import Any, Dict, Optional
 
+import orjson
 import structlog
 
-os.environ["HICA_LOG_LEVEL"] = "DEBUG"
+os.environ.setdefault("HICA_LOG_LEVEL", "DEBUG")
 # Global registry for thread-specific loggers
 _thread_loggers = {}
+# Most per-thread log files kept open at once; older ones are reopened on demand
+MAX_OPEN_THREAD_LOG_FILES = 64
+_SAFE_THREAD_ID = re.compile(r"[\w.-]+")
+
+
+def _orjson_dumps(obj: Any, default=None, **kwargs) -> str:
+    """JSON serializer for structlog, via orjson."""
+    return orjson.dumps(obj, default=default, option=orjson.OPT_NON_STR_KEYS).decode()
+
+
+class ThreadFileHandler(logging.Handler):
+    """
+    Write records for a thread to logs/thread_<thread_id>.log, reading
+    thread_id from the structlog JSON message; files are opened on a thread's
+    first record.
+
+    Only threads passed to get_thread_logger get a file, unless all_threads is
+    set (HICA_THREAD_LOG_FILES=all): then any record with a thread_id does,
+    including thread_ids bound with structlog.contextvars.
+
+    Runs on the QueueListener thread, so file writes never block the event loop.
+    """
+
+    def __init__(
+        self, max_open_files: int = MAX_OPEN_THREAD_LOG_FILES, all_threads: bool = False
+    ):
+        super().__init__(level=logging.DEBUG)  # Always DEBUG for file
+        self.max_open_files = max_open_files
+        self.all_threads = all_threads
+        self._files: "OrderedDict[str, logging.FileHandler]" = OrderedDict()
+
+    def emit(self, record: logging.LogRecord) -> None:
+        # An exception here would stop the QueueListener thread, and with it
+        # console logging, so failures are reported through handleError
+        try:
+            thread_id = self._thread_id(record)
+            if thread_id is None or (
+                not self.all_threads and thread_id not in _thread_loggers
+            ):
+                return
+            file_handler = self._files.get(thread_id)
+            if file_handler is None:
+                file_handler = logging.FileHandler(f"logs/thread_{thread_id}.log")
+                file_handler.setFormatter(logging.Formatter("%(message)s"))
+                self._files[thread_id] = file_handler
+                if len(self._files) > self.max_open_files:
+                    self._files.popitem(last=False)[1].close()
+            else:
+                self._files.move_to_end(thread_id)
+            file_handler.handle(record)
+        except Exception:
+            self.handleError(record)
+
+    @staticmethod
+    def _thread_id(record: logging.LogRecord) -> Optional[str]:
+        try:
+            event = orjson.loads(record.getMessage())
+        except orjson.JSONDecodeError:
+            return None
+        thread_id = event.get("thread_id") if isinstance(event, dict) else None
+        if thread_id is None:
+            return None
+        thread_id = str(thread_id)
+        # The id becomes part of a file name
+        return thread_id if _SAFE_THREAD_ID.fullmatch(thread_id) else None
+
+    def close(self) -> None:
+        for file_handler in self._files.values():
+            file_handler.close()
+        self._files.clear()
+        super().close()
+
+
+# Background listener that owns the console and per-thread file handlers
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def _stop_listener() -> None:
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+atexit.register(_stop_listener)
 
 
 def configure_logging():
@@ -29,15 +122,29 @@ def configure_logging():
     stream_handler = logging.StreamHandler(sys.stdout)
     stream_handler.setFormatter(logging.Formatter("%(message)s"))
     stream_handler.setLevel(log_level_int)
-    logger.addHandler(stream_handler)
+
+    # Records are only queued on the logging call; console and file output
+    # happen on the listener thread
+    global _listener
+    _stop_listener()
+    log_queue: queue.Queue = queue.Queue(-1)
+    logger.addHandler(logging.handlers.QueueHandler(log_queue))
+    thread_files = ThreadFileHandler(
+        all_threads=os.getenv("HICA_THREAD_LOG_FILES", "").lower() == "all"
+    )
+    _listener = logging.handlers.QueueListener(
+        log_queue, stream_handler, thread_files, respect_handler_level=True
+    )
+    _listener.start()
 
     # Configure structlog
     structlog.configure_once(  # Prevent reconfiguration issues
         processors=[
+            structlog.contextvars.merge_contextvars,
             structlog.processors.TimeStamper(fmt="iso"),
             structlog.stdlib.add_log_level,
             structlog.stdlib.add_logger_name,
-            structlog.processors.JSONRenderer(),
+            structlog.processors.JSONRenderer(serializer=_orjson_dumps),
         ],
         context_class=dict,
         logger_factory=structlog.stdlib.LoggerFactory(),
@@ -51,25 +158,15 @@ def configure_logging():
 
 
 def get_thread_logger(thread_id: str, metadata: Dict[str, Any] = None):
-    """Get or create a logger for a specific thread with its own log file."""
+    """
+    Get or create a logger for a specific thread with its own log file.
+
+    Records carrying this thread_id are written to logs/thread_<thread_id>.log
+    by the shared ThreadFileHandler; no handler is added per thread.
+    """
     if thread_id in _thread_loggers:
         return _thread_loggers[thread_id]
 
-    # Get the underlying standard library logger
-    std_logger = logging.getLogger("hica")
-
-    # Remove existing file handlers to avoid duplicates
-    std_logger.handlers = [
-        h for h in std_logger.handlers if not isinstance(h, logging.FileHandler)
-    ]
-
-    # Add file handler for this specific thread
-    log_file = f"logs/thread_{thread_id}.log"
-    file_handler = logging.FileHandler(log_file)
-    file_handler.setFormatter(logging.Formatter("%(message)s"))
-    file_handler.setLevel(logging.DEBUG)  # Always DEBUG for file
-    std_logger.addHandler(file_handler)
-
     # Get structlog logger and bind context
     structlog_logger = structlog.get_logger("hica")
     if metadata is None:
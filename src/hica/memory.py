@@ -32,18 +32,114 @@ Design Notes:
 - This abstraction keeps HICA minimal, composable, and production-ready.
 """
 
-import json
+import asyncio
+import contextlib
+import itertools
+import os
 import sqlite3
+import tempfile
+import threading
+from collections import OrderedDict
 from pathlib import Path
-from typing import Dict, Generic, Optional, TypeVar
+from typing import BinaryIO, Dict, Generic, Iterator, Optional, Tuple, TypeVar
 
-from pymongo import MongoClient
+import orjson
+from pymongo import MongoClient, ReplaceOne
 
-from hica.core import Thread
+from hica.core import Event, Thread
+from hica.logging import logger
 
 T = TypeVar("T")
 
 
+@contextlib.contextmanager
+def _atomic_open(path: Path) -> Iterator[BinaryIO]:
+    """
+    Open a temp file that atomically replaces path once the block succeeds.
+
+    Each call gets its own temp file, so concurrent writers of one path never
+    share it; it is removed if the block or the replace fails.
+    """
+    f = tempfile.NamedTemporaryFile(
+        "wb", dir=path.parent, prefix=f"{path.name}.", suffix=".tmp", delete=False
+    )
+    try:
+        with f:
+            yield f
+        os.replace(f.name, path)
+    except BaseException:
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(f.name)
+        raise
+
+
+def _atomic_write_bytes(path: Path, data: bytes) -> None:
+    with _atomic_open(path) as f:
+        f.write(data)
+
+
+def _connect_sqlite(db_path: str, **kwargs) -> sqlite3.Connection:
+    """
+    Open a SQLite connection tuned for frequent small writes.
+
+    WAL lets reads proceed during a write, and synchronous=NORMAL only syncs
+    at checkpoints instead of on every commit.
+    """
+    conn = sqlite3.connect(db_path, **kwargs)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    return conn
+
+
+class SQLitePool:
+    """
+    One shared writer connection plus a read-only connection per OS thread.
+
+    Writes are serialized by a lock (SQLite allows a single writer anyway) and
+    committed when the outermost write() block exits, so nested writes join one
+    transaction. Reads use the calling thread's own connection and, with WAL,
+    run alongside writes, e.g. from FastAPI's threadpool.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._writer = _connect_sqlite(db_path, check_same_thread=False)
+        self._write_lock = threading.RLock()
+        self._write_depth = 0
+        self._readers = threading.local()
+
+    @contextlib.contextmanager
+    def write(self) -> Iterator[sqlite3.Connection]:
+        with self._write_lock:
+            self._write_depth += 1
+            try:
+                yield self._writer
+            except BaseException:
+                if self._write_depth == 1:
+                    self._writer.rollback()
+                raise
+            else:
+                if self._write_depth == 1:
+                    self._writer.commit()
+            finally:
+                self._write_depth -= 1
+
+    @contextlib.contextmanager
+    def read(self) -> Iterator[sqlite3.Connection]:
+        if self.db_path == ":memory:":
+            # Each connection would get its own empty in-memory database
+            with self._write_lock:
+                yield self._writer
+            return
+        conn = getattr(self._readers, "conn", None)
+        if conn is None:
+            conn = _connect_sqlite(self.db_path)
+            conn.execute("PRAGMA query_only=1")
+            self._readers.conn = conn
+        yield conn
+
+
 class MemoryStore(Generic[T]):
     """Minimal key-value memory store interface."""
 
@@ -85,13 +181,11 @@ class FileMemoryStore(MemoryStore[T]):
 
     def _load(self) -> Dict[str, T]:
         if self.file_path.exists():
-            with self.file_path.open("r") as f:
-                return json.load(f)
+            return orjson.loads(self.file_path.read_bytes())
         return {}
 
     def _save(self):
-        with self.file_path.open("w") as f:
-            json.dump(self._store, f)
+        _atomic_write_bytes(self.file_path, orjson.dumps(self._store))
 
     def get(self, key: str) -> Optional[T]:
         return self._store.get(key)
@@ -112,8 +206,25 @@ class FileMemoryStore(MemoryStore[T]):
 class ConversationMemoryStore:
     """
     Unified conversation store supporting file-based, SQL-based, and MongoDB (NoSQL) storage.
-    Specify backend_type as 'file', 'sql', or 'mongo'.
-    For 'file', provide context_dir. For 'sql', provide db_path. For 'mongo', provide uri, db_name, and collection.
+    Specify backend_type as 'file', 'log', 'sql', or 'mongo'.
+    For 'file' and 'log', provide context_dir. For 'sql', provide db_path. For 'mongo', provide uri, db_name, and collection,
+    or pass mongo_client to share one pooled MongoClient across stores.
+
+    Set flush_interval (seconds) to buffer writes: set() then keeps the thread in
+    memory and a single delayed flush persists every thread changed in that
+    window, writing snapshots of them in a worker thread so the event loop is
+    not blocked. Call flush(thread_id) once a thread reaches a final state, and
+    flush() on shutdown to persist anything still pending.
+
+    The 'log' backend keeps each thread as an append-only <id>.ndjson file of
+    events plus a small <id>.meta.json, so saving a thread this store already
+    wrote appends only its new events instead of rewriting the whole thread.
+    The log is rewritten in full only when the event list was truncated or
+    replaced (e.g. by summarization) or was not written by this store.
+
+    Set cache_size to keep that many recently used threads in memory, so
+    repeated get() calls for a hot thread skip the backend read and parse.
+    Only use it when this store is the sole writer of its backend.
     """
 
     def __init__(
@@ -124,116 +235,393 @@ class ConversationMemoryStore:
         mongo_uri: str = "mongodb://localhost:27017",
         mongo_db: str = "hica",
         mongo_collection: str = "threads",
+        mongo_client: Optional[MongoClient] = None,
+        flush_interval: Optional[float] = None,
+        cache_size: int = 0,
     ):
         self.backend_type = backend_type
-        if backend_type == "file":
+        self.flush_interval = flush_interval
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[str, Thread]" = OrderedDict()
+        self._dirty: Dict[str, Thread] = {}
+        # thread_id -> set() call that last buffered it, so a flush only clears
+        # threads that were not set() again while it was writing
+        self._dirty_generation: Dict[str, int] = {}
+        self._generations = itertools.count()
+        self._dirty_lock = threading.Lock()
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        # Serializes backend writes, since timed flushes run in a worker thread
+        self._write_lock = threading.RLock()
+        if backend_type in ("file", "log"):
             self.dir_path = Path(context_dir)
             self.dir_path.mkdir(parents=True, exist_ok=True)
+            # thread_id -> (events persisted, last persisted event,
+            # thread.events_version) for 'log'
+            self._persisted: Dict[str, Tuple[int, Event, int]] = {}
         elif backend_type == "sql":
-            self.conn = sqlite3.connect(db_path)
-            self.conn.execute(
-                "CREATE TABLE IF NOT EXISTS threads (id TEXT PRIMARY KEY, data TEXT)"
-            )
-            self.conn.commit()
+            self.pool = SQLitePool(db_path)
+            with self.pool.write() as conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS threads (id TEXT PRIMARY KEY, data TEXT)"
+                )
         elif backend_type == "mongo":
             self.mongo_store = MongoMemoryStore(
-                uri=mongo_uri, db_name=mongo_db, collection=mongo_collection
+                uri=mongo_uri,
+                db_name=mongo_db,
+                collection=mongo_collection,
+                client=mongo_client,
             )
         else:
-            raise ValueError("backend_type must be 'file', 'sql', or 'mongo'")
+            raise ValueError("backend_type must be 'file', 'log', 'sql', or 'mongo'")
 
     def set(self, thread: Thread):
         if not thread.thread_id:
             raise ValueError("Thread must have a thread_id before storing.")
+        self._cache_put(thread)
+        if self.flush_interval is None:
+            self._write(thread)
+            return
+        with self._dirty_lock:
+            self._dirty[thread.thread_id] = thread
+            self._dirty_generation[thread.thread_id] = next(self._generations)
+        self._schedule_flush()
+
+    def _schedule_flush(self):
+        if self._flush_handle is not None:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # No event loop to defer to, so write through.
+            self.flush()
+            return
+        self._flush_handle = loop.call_later(self.flush_interval, self._timed_flush)
+
+    def _timed_flush(self):
+        """Timer callback: write the buffered threads without blocking the loop."""
+        self._flush_handle = None
+        # Snapshots, because agent loops keep changing the buffered threads
+        # while the executor writes them
+        pending = self._pending(snapshot=True)
+        future = asyncio.get_running_loop().run_in_executor(
+            None, self._write_pending, pending
+        )
+        future.add_done_callback(self._log_flush_error)
+
+    @staticmethod
+    def _log_flush_error(future: asyncio.Future):
+        if not future.cancelled() and future.exception() is not None:
+            logger.error(
+                "Buffered thread flush failed; threads stay buffered",
+                error=str(future.exception()),
+            )
+
+    def buffered(self, thread_id: str) -> Optional[Thread]:
+        """Return the thread if it has changes not yet written to the backend."""
+        with self._dirty_lock:
+            return self._dirty.get(thread_id)
+
+    def flush(self, thread_id: Optional[str] = None):
+        """
+        Persist all buffered threads, or only thread_id if given.
+
+        A thread leaves the buffer only once it has been written, so if a write
+        fails the exception propagates and every unwritten thread stays
+        buffered for the next flush.
+        """
+        if thread_id is None and self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        self._write_pending(self._pending(thread_id))
+
+    async def aflush(self, thread_id: Optional[str] = None):
+        """
+        Like flush, but writes in a worker thread.
+
+        The buffered threads are snapshotted on the calling event loop first,
+        so the loop may keep changing them while they are written.
+        """
+        if thread_id is None and self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        pending = self._pending(thread_id, snapshot=True)
+        await asyncio.to_thread(self._write_pending, pending)
+
+    def _pending(
+        self, thread_id: Optional[str] = None, snapshot: bool = False
+    ) -> Dict[str, Tuple[Thread, int]]:
+        """
+        Buffered threads, or only thread_id, with their set() generation;
+        copied if snapshot.
+        """
+        with self._dirty_lock:
+            if thread_id is None:
+                pending = dict(self._dirty)
+            elif thread_id in self._dirty:
+                pending = {thread_id: self._dirty[thread_id]}
+            else:
+                return {}
+            generations = {key: self._dirty_generation[key] for key in pending}
+        if snapshot:
+            for thread_id, thread in pending.items():
+                # Dump new events into the original's cache first, so the
+                # next flush does not dump them again
+                thread.serialized_events()
+                pending[thread_id] = thread.snapshot()
+        return {
+            thread_id: (thread, generations[thread_id])
+            for thread_id, thread in pending.items()
+        }
+
+    def _write_pending(self, pending: Dict[str, Tuple[Thread, int]]):
+        if not pending:
+            return
+        with self._write_lock:
+            if self.backend_type == "sql":
+                # One transaction for the whole batch
+                with self.pool.write():
+                    for thread, _ in pending.values():
+                        self._write(thread)
+                self._mark_written(pending)
+            elif self.backend_type == "mongo":
+                self.mongo_store.set_many(
+                    {thread_id: thread for thread_id, (thread, _) in pending.items()}
+                )
+                self._mark_written(pending)
+            else:
+                for thread_id, entry in pending.items():
+                    self._write(entry[0])
+                    self._mark_written({thread_id: entry})
+
+    def _mark_written(self, written: Dict[str, Tuple[Thread, int]]):
+        """Unbuffer written threads unless set() buffered them again since."""
+        with self._dirty_lock:
+            for thread_id, (_, generation) in written.items():
+                if self._dirty_generation.get(thread_id) == generation:
+                    del self._dirty[thread_id]
+                    del self._dirty_generation[thread_id]
+
+    def _write(self, thread: Thread):
         if self.backend_type == "file":
             file_path = self.dir_path / f"{thread.thread_id}.json"
-            with file_path.open("w") as f:
-                f.write(thread.to_json())
+            with _atomic_open(file_path) as f:
+                thread.write_json(f)
+        elif self.backend_type == "log":
+            self._write_log(thread)
         elif self.backend_type == "sql":
             data = thread.to_json()
-            self.conn.execute(
-                "REPLACE INTO threads (id, data) VALUES (?, ?)",
-                (thread.thread_id, data),
-            )
-            self.conn.commit()
+            with self.pool.write() as conn:
+                conn.execute(
+                    "REPLACE INTO threads (id, data) VALUES (?, ?)",
+                    (thread.thread_id, data),
+                )
         elif self.backend_type == "mongo":
             self.mongo_store.set(thread.thread_id, thread)
 
+    def _write_log(self, thread: Thread):
+        log_path = self.dir_path / f"{thread.thread_id}.ndjson"
+        events = thread.events
+        count, tail, version = self._persisted.get(thread.thread_id, (0, None, None))
+        appendable = (
+            tail is not None
+            and version == thread.events_version
+            and count <= len(events)
+            and events[count - 1] is tail
+        )
+        new_events = thread.serialized_events(count if appendable else 0)
+        lines = b"".join(orjson.dumps(event) + b"\n" for event in new_events)
+        if appendable:
+            with log_path.open("ab") as f:
+                f.write(lines)
+        else:
+            _atomic_write_bytes(log_path, lines)
+        meta = {"thread_id": thread.thread_id, "metadata": thread.metadata}
+        _atomic_write_bytes(
+            self.dir_path / f"{thread.thread_id}.meta.json",
+            orjson.dumps(meta, default=str),
+        )
+        if events:
+            self._persisted[thread.thread_id] = (
+                len(events),
+                events[-1],
+                thread.events_version,
+            )
+        else:
+            self._persisted.pop(thread.thread_id, None)
+
+    def _read_log(self, thread_id: str) -> Optional[Thread]:
+        meta_path = self.dir_path / f"{thread_id}.meta.json"
+        # Not while a flush in a worker thread is appending to the log or
+        # updating _persisted
+        with self._write_lock:
+            if not meta_path.exists():
+                return None
+            data = orjson.loads(meta_path.read_bytes())
+            log_path = self.dir_path / f"{thread_id}.ndjson"
+            lines = log_path.read_bytes().splitlines() if log_path.exists() else []
+        data["events"] = [orjson.loads(line) for line in lines if line]
+        thread = Thread.from_dict_trusted(data)
+        if thread.events:
+            with self._write_lock:
+                self._persisted[thread_id] = (
+                    len(thread.events),
+                    thread.events[-1],
+                    thread.events_version,
+                )
+        return thread
+
+    def _cache_put(self, thread: Thread):
+        if self.cache_size <= 0:
+            return
+        self._cache[thread.thread_id] = thread
+        self._cache.move_to_end(thread.thread_id)
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
     def get(self, thread_id: str) -> Optional[Thread]:
+        thread = self._get_in_memory(thread_id)
+        if thread is not None:
+            return thread
+        thread = self._read(thread_id)
+        if thread is not None:
+            self._cache_put(thread)
+        return thread
+
+    async def aget(self, thread_id: str) -> Optional[Thread]:
+        """
+        Like get, but a backend read runs in a worker thread.
+
+        The write buffer and the LRU cache are only used on the calling event
+        loop, so they need no locking.
+        """
+        thread = self._get_in_memory(thread_id)
+        if thread is not None:
+            return thread
+        thread = await asyncio.to_thread(self._read, thread_id)
+        # Prefer a copy that set() stored while the read was running
+        newer = self._get_in_memory(thread_id)
+        if newer is not None:
+            return newer
+        if thread is not None:
+            self._cache_put(thread)
+        return thread
+
+    def _get_in_memory(self, thread_id: str) -> Optional[Thread]:
+        """The thread from the write buffer or the LRU cache, if it is there."""
+        thread = self.buffered(thread_id)
+        if thread is not None:
+            return thread
+        thread = self._cache.get(thread_id)
+        if thread is not None:
+            self._cache.move_to_end(thread_id)
+        return thread
+
+    def _read(self, thread_id: str) -> Optional[Thread]:
         if self.backend_type == "file":
             file_path = self.dir_path / f"{thread_id}.json"
             if not file_path.exists():
                 return None
-            with file_path.open("r") as f:
-                return Thread.from_json(f.read())
+            return Thread.from_json_trusted(file_path.read_bytes())
+        elif self.backend_type == "log":
+            return self._read_log(thread_id)
         elif self.backend_type == "sql":
-            cursor = self.conn.execute(
-                "SELECT data FROM threads WHERE id = ?", (thread_id,)
-            )
-            row = cursor.fetchone()
+            with self.pool.read() as conn:
+                row = conn.execute(
+                    "SELECT data FROM threads WHERE id = ?", (thread_id,)
+                ).fetchone()
             if row:
-                return Thread.from_json(row[0])
+                return Thread.from_json_trusted(row[0])
             return None
         elif self.backend_type == "mongo":
             return self.mongo_store.get(thread_id)
 
     def delete(self, thread_id: str):
+        with self._dirty_lock:
+            self._dirty.pop(thread_id, None)
+            self._dirty_generation.pop(thread_id, None)
+        self._cache.pop(thread_id, None)
         if self.backend_type == "file":
             file_path = self.dir_path / f"{thread_id}.json"
             if file_path.exists():
                 file_path.unlink()
+        elif self.backend_type == "log":
+            self._persisted.pop(thread_id, None)
+            for suffix in (".meta.json", ".ndjson"):
+                (self.dir_path / f"{thread_id}{suffix}").unlink(missing_ok=True)
         elif self.backend_type == "sql":
-            self.conn.execute("DELETE FROM threads WHERE id = ?", (thread_id,))
-            self.conn.commit()
+            with self.pool.write() as conn:
+                conn.execute("DELETE FROM threads WHERE id = ?", (thread_id,))
         elif self.backend_type == "mongo":
             self.mongo_store.delete(thread_id)
 
     def all(self) -> Dict[str, Thread]:
+        persisted = self._all_persisted()
+        with self._dirty_lock:
+            persisted.update(self._dirty)
+        return persisted
+
+    def _all_persisted(self) -> Dict[str, Thread]:
         if self.backend_type == "file":
             result = {}
-            for file in self.dir_path.glob("*.json"):
-                with file.open("r") as f:
-                    result[file.stem] = Thread.from_json(f.read())
+            # scandir yields names without a stat per file, unlike Path.glob
+            with os.scandir(self.dir_path) as entries:
+                for entry in entries:
+                    if entry.name.endswith(".json") and entry.is_file():
+                        with open(entry.path, "rb") as f:
+                            result[entry.name[:-5]] = Thread.from_json_trusted(f.read())
+            return result
+        elif self.backend_type == "log":
+            result = {}
+            with os.scandir(self.dir_path) as entries:
+                for entry in entries:
+                    if entry.name.endswith(".meta.json"):
+                        thread_id = entry.name[: -len(".meta.json")]
+                        thread = self._read_log(thread_id)
+                        if thread is not None:
+                            result[thread_id] = thread
             return result
         elif self.backend_type == "sql":
-            cursor = self.conn.execute("SELECT id, data FROM threads")
-            return {row[0]: Thread.from_json(row[1]) for row in cursor.fetchall()}
+            with self.pool.read() as conn:
+                rows = conn.execute("SELECT id, data FROM threads").fetchall()
+            return {row[0]: Thread.from_json_trusted(row[1]) for row in rows}
         elif self.backend_type == "mongo":
             return self.mongo_store.all()
 
 
 class SQLMemoryStore(MemoryStore[T]):
     def __init__(self, db_path: str = "memory.db", table: str = "kv_store"):
-        self.conn = sqlite3.connect(db_path)
+        self.pool = SQLitePool(db_path)
         self.table = table
-        self.conn.execute(
-            f"CREATE TABLE IF NOT EXISTS {self.table} (key TEXT PRIMARY KEY, value TEXT)"
-        )
-        self.conn.commit()
+        with self.pool.write() as conn:
+            conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.table} (key TEXT PRIMARY KEY, value TEXT)"
+            )
 
     def get(self, key: str) -> Optional[T]:
-        cursor = self.conn.execute(
-            f"SELECT value FROM {self.table} WHERE key = ?", (key,)
-        )
-        row = cursor.fetchone()
+        with self.pool.read() as conn:
+            row = conn.execute(
+                f"SELECT value FROM {self.table} WHERE key = ?", (key,)
+            ).fetchone()
         if row:
-            return json.loads(row[0])
+            return orjson.loads(row[0])
         return None
 
     def set(self, key: str, value: T) -> None:
-        value_json = json.dumps(value)
-        self.conn.execute(
-            f"REPLACE INTO {self.table} (key, value) VALUES (?, ?)", (key, value_json)
-        )
-        self.conn.commit()
+        value_json = orjson.dumps(value).decode()
+        with self.pool.write() as conn:
+            conn.execute(
+                f"REPLACE INTO {self.table} (key, value) VALUES (?, ?)",
+                (key, value_json),
+            )
 
     def delete(self, key: str) -> None:
-        self.conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
-        self.conn.commit()
+        with self.pool.write() as conn:
+            conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
 
     def all(self) -> Dict[str, T]:
-        cursor = self.conn.execute(f"SELECT key, value FROM {self.table}")
-        return {row[0]: json.loads(row[1]) for row in cursor.fetchall()}
+        with self.pool.read() as conn:
+            rows = conn.execute(f"SELECT key, value FROM {self.table}").fetchall()
+        return {row[0]: orjson.loads(row[1]) for row in rows}
 
 
 class PromptStore:
@@ -270,17 +658,31 @@ class PromptStore:
 
 
 class MongoMemoryStore(MemoryStore[T]):
+    # Mongo's _id is not a Thread field; leave it on the server
+    _THREAD_PROJECTION = {"_id": 0}
+    # Documents fetched per round trip when iterating all threads
+    ALL_BATCH_SIZE = 1000
+
     def __init__(
-        self, uri="mongodb://localhost:27017", db_name="hica", collection="threads"
+        self,
+        uri="mongodb://localhost:27017",
+        db_name="hica",
+        collection="threads",
+        client: Optional[MongoClient] = None,
     ):
-        self.client = MongoClient(uri)
+        # A caller-provided client lets several stores share one connection pool.
+        self.client = client or MongoClient(uri)
         self.db = self.client[db_name]
         self.collection = self.db[collection]
 
+    def ensure_indexes(self) -> None:
+        """Create the unique thread_id index used by get/set/delete lookups."""
+        self.collection.create_index("thread_id", unique=True)
+
     def get(self, key: str) -> Optional[T]:
-        doc = self.collection.find_one({"thread_id": key})
+        doc = self.collection.find_one({"thread_id": key}, self._THREAD_PROJECTION)
         if doc:
-            return Thread(**doc)  # or T(**doc) if generic
+            return Thread.model_validate(doc)  # or T.model_validate(doc) if generic
         return None
 
     def set(self, key: str, value: T) -> None:
@@ -288,8 +690,27 @@ class MongoMemoryStore(MemoryStore[T]):
             {"thread_id": key}, value.model_dump(exclude_none=True), upsert=True
         )
 
+    def set_many(self, items: Dict[str, T]) -> None:
+        """Upsert several threads in one unordered bulk_write round trip."""
+        if not items:
+            return
+        self.collection.bulk_write(
+            [
+                ReplaceOne(
+                    {"thread_id": key}, value.model_dump(exclude_none=True), upsert=True
+                )
+                for key, value in items.items()
+            ],
+            ordered=False,
+        )
+
     def delete(self, key: str) -> None:
         self.collection.delete_one({"thread_id": key})
 
     def all(self) -> Dict[str, T]:
-        return {doc["thread_id"]: Thread(**doc) for doc in self.collection.find()}
+        return {
+            doc["thread_id"]: Thread.model_validate(doc)
+            for doc in self.collection.find(
+                {}, self._THREAD_PROJECTION, batch_size=self.ALL_BATCH_SIZE
+            )
+        }
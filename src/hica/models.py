@@ -1,11 +1,34 @@
 import base64
+import functools
 import json
 from typing import Any, Dict, Optional
+from xml.sax.saxutils import escape
 
+import orjson
 from pydantic import BaseModel, Field
 from pydantic.json_schema import SkipJsonSchema
 
 
+# Content prefix of the chat message rendered for a tool_response event
+TOOL_RESULT_PREFIX = "Tool execution result: "
+
+
+def to_message_text(data: Any) -> str:
+    """Render event data for an LLM message: strings as is, anything else as JSON."""
+    if isinstance(data, str):
+        return data
+    return orjson.dumps(data, default=str, option=orjson.OPT_NON_STR_KEYS).decode()
+
+
+def _xml_element(tag: str, text: str) -> str:
+    """One XML element with escaped text, written the way ElementTree would."""
+    return f"<{tag}>{escape(text)}</{tag}>" if text else f"<{tag} />"
+
+
+# Exact types serialize_mcp_result returns unchanged
+_PASSTHROUGH_TYPES = frozenset({str, int, float, bool})
+
+
 def serialize_mcp_result(result: Any) -> dict | str | float | int | list | None:
     """
     Serializes the output of an MCP tool call into a format suitable for storage in an Event.
@@ -32,8 +55,15 @@ def serialize_mcp_result(result: Any) -> dict | str | float | int | list | None:
         - None: returns None.
         - Any other type: returns its string representation.
     """
-    if result is None:
-        return None
+    # Plain JSON values are the common case; resolve them by exact type before
+    # the hasattr probes below, which only matter for content objects
+    result_type = type(result)
+    if result is None or result_type in _PASSTHROUGH_TYPES:
+        return result
+    if result_type is list:
+        return [serialize_mcp_result(item) for item in result]
+    if result_type is dict and not ("mime_type" in result and "data" in result):
+        return result
 
     # Handle Pydantic Models first
     if hasattr(result, "model_dump"):
@@ -105,6 +135,67 @@ class Event(BaseModel):
     class Config:
         exclude_none = True
 
+    @functools.cached_property
+    def rendered_message(self) -> Optional[Dict[str, str]]:
+        """to_message(), computed once per event and reused on every LLM call."""
+        return self.to_message()
+
+    @functools.cached_property
+    def rendered_xml(self) -> str:
+        """to_xml(), computed once per event and reused by serialize_for_llm."""
+        return self.to_xml()
+
+    def to_xml(self) -> str:
+        """Render this event as an XML fragment tagged with its intent or type."""
+        if isinstance(self.data, dict):
+            tag = self.data.get("intent", self.type)
+            body = "".join(
+                _xml_element(key, str(value))
+                for key, value in self.data.items()
+                if key != "intent"
+            )
+        elif isinstance(self.data, (str, float, int)):
+            tag, body = self.type, escape(str(self.data))
+        else:
+            tag, body = self.type, ""
+        return f"<{tag}>{body}</{tag}>" if body else f"<{tag} />"
+
+    def to_message(self) -> Optional[Dict[str, str]]:
+        """Render this event as an LLM chat message, or None if it is not sent."""
+        if self.type == "user_input":
+            return {"role": "user", "content": to_message_text(self.data)}
+        if self.type == "llm_response":
+            if "intent" in self.data:
+                intent = self.data["intent"]
+                if intent in ["done", "clarification"]:
+                    return {"role": "assistant", "content": intent}
+                tool_args = to_message_text(self.data.get("arguments", {}))
+                return {
+                    "role": "assistant",
+                    "content": f"Selected tool '{intent}' with parameters: {tool_args}",
+                }
+            return {"role": "assistant", "content": to_message_text(self.data)}
+        if self.type == "tool_response":
+            if not isinstance(self.data, dict):
+                content_for_llm = to_message_text(self.data)
+            else:
+                response_data = self.data.get("response", "")
+                if isinstance(response_data, dict) and "llm_content" in response_data:
+                    content_for_llm = response_data["llm_content"]
+                else:
+                    content_for_llm = to_message_text(response_data)
+            return {
+                "role": "user",
+                "content": f"{TOOL_RESULT_PREFIX}{content_for_llm}",
+            }
+        if self.type == "context_summary":
+            summary = to_message_text(self.data)
+            return {
+                "role": "user",
+                "content": f"Summary of the conversation so far: {summary}",
+            }
+        return None
+
 
 class DynamicToolCall(BaseModel):
     """Represents a tool call with intent and arguments."""
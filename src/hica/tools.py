@@ -1,6 +1,7 @@
 import asyncio
 import inspect
 import json
+from contextlib import AsyncExitStack
 from typing import Any, Callable, Dict, List, Optional, Tuple, Type, Union
 
 from fastmcp import Client
@@ -35,11 +36,24 @@ def create_model_from_tool_schema(tool_def: ToolDefinition) -> Type[BaseModel]:
     return create_model(model_name, __base__=BaseModel, **field_definitions)
 
 
+def tool_needs_arguments(tool_def: ToolDefinition) -> bool:
+    """Whether any parameter must be supplied, i.e. is required or has no default."""
+    schema = tool_def.parameters_json_schema
+    if schema.get("required"):
+        return True
+    return any(
+        "default" not in param for param in schema.get("properties", {}).values()
+    )
+
+
 class BaseTool:
     """Base class for all tools. Ensures a consistent interface for execution and metadata."""
 
     name: str
     description: str
+    # Set True for tools whose result the agent does not need to plan its next
+    # step (logging, notifications); agent_loop then runs them in the background.
+    side_effect_only: bool = False
 
     def get_confirmation_prompt(self, params: dict) -> str:
         """Return a human-readable description of what this tool will do with these params."""
@@ -84,45 +98,103 @@ def _create_wrapper_tool(func: Callable) -> BaseTool:
 class MCPConnectionManager:
     def __init__(self, server_path_or_url):
         self.client = Client(server_path_or_url)
+        self._lock = asyncio.Lock()
 
     async def __aenter__(self):
         """Establish connection to the MCP server with context manager"""
-        if not self.client.is_connected():
-            await self.client.__aenter__()
+        await self.ensure_connected()
         return self
 
     async def __aexit__(self, exc_type=None, exc_value=None, traceback=None):
         """Close connection to the MCP server with context manager"""
+        async with self._lock:
+            if self.client.is_connected():
+                await self.client.__aexit__(exc_type, exc_value, traceback)
+
+    async def ensure_connected(self):
+        """Connect (or reconnect after a drop) if the client is not connected.
+
+        The lock keeps concurrent callers from opening parallel sessions.
+        """
         if self.client.is_connected():
-            await self.client.__aexit__(exc_type, exc_value, traceback)
+            return
+        async with self._lock:
+            if not self.client.is_connected():
+                await self.client.__aenter__()
 
     async def connect(self):
         """Establish connection to the MCP server"""
-        await self.__aenter__()
+        await self.ensure_connected()
 
     async def disconnect(self):
         """Close connection to the MCP server"""
         await self.__aexit__(None, None, None)
 
+    async def aclose(self):
+        """Close the connection and drop this manager from the shared pool."""
+        await self.disconnect()
+        for key, manager in list(_mcp_managers.items()):
+            if manager is self:
+                del _mcp_managers[key]
+
     async def call_tool(self, name, arguments=None):
-        """Call a tool on the MCP server"""
-        if not self.client.is_connected():
-            raise RuntimeError("Not connected. Call connect() first.")
+        """Call a tool on the MCP server, connecting on first use"""
+        await self.ensure_connected()
         return await self.client.call_tool(name, arguments)
 
     async def list_tools(self):
-        """List all available tools on the MCP server"""
-        if not self.client.is_connected():
-            raise RuntimeError("Not connected. Call connect() first.")
+        """List all available tools on the MCP server, connecting on first use"""
+        await self.ensure_connected()
         return await self.client.list_tools()
 
 
+# Shared MCP connection managers keyed by server config
+_mcp_managers: Dict[str, MCPConnectionManager] = {}
+
+
+def get_mcp_manager(server_path_or_url) -> MCPConnectionManager:
+    """Get or create the shared MCPConnectionManager for a server config.
+
+    Managers connect lazily on first use and stay connected, so repeated
+    callers reuse one session instead of paying the server handshake again.
+    """
+    if isinstance(server_path_or_url, dict):
+        key = json.dumps(server_path_or_url, sort_keys=True)
+    else:
+        key = str(server_path_or_url)
+    if key not in _mcp_managers:
+        _mcp_managers[key] = MCPConnectionManager(server_path_or_url)
+    return _mcp_managers[key]
+
+
+async def connect_mcp_servers(
+    mcp_config: Dict[str, Any], exit_stack: AsyncExitStack
+) -> List[MCPConnectionManager]:
+    """Connect every server of an ``mcpServers`` config concurrently.
+
+    Each server gets its own shared manager, so startup takes as long as the
+    slowest server rather than the sum of all of them. Every manager is
+    registered on ``exit_stack`` and is closed when the stack unwinds.
+    """
+    managers = [
+        get_mcp_manager({"mcpServers": {name: server_config}})
+        for name, server_config in mcp_config.get("mcpServers", {}).items()
+    ]
+    for manager in managers:
+        exit_stack.push_async_callback(manager.aclose)
+    await asyncio.gather(*(manager.ensure_connected() for manager in managers))
+    return managers
+
+
 class ToolRegistry:
     def __init__(self):
         self.local_tools: Dict[str, BaseTool] = {}
         self.local_tool_defs: Dict[str, ToolDefinition] = {}
         self.mcp_tools: Dict[str, Tuple[MCPConnectionManager, ToolDefinition]] = {}
         self.all_tool_defs: Dict[str, ToolDefinition] = {}
+        # Bumped on every registration or removal so callers can cache
+        # anything derived from the tool definitions.
+        self.version = 0
 
     def _register_local_tool(
         self, tool: Union[Callable, BaseTool], intent: Optional[str] = None
@@ -186,6 +258,7 @@ class ToolRegistry:
         self.local_tools[tool_intent] = tool_instance
         self.local_tool_defs[tool_intent] = tool_def
         self.all_tool_defs[tool_intent] = tool_def
+        self.version += 1
         logger.info(f"Registered local tool: {tool_intent}")
 
     def tool(self, intent: Optional[str] = None):
@@ -216,10 +289,12 @@ class ToolRegistry:
             del self.local_tools[name]
             del self.local_tool_defs[name]
             del self.all_tool_defs[name]
+            self.version += 1
             logger.info(f"Removed local tool: {name}")
         elif name in self.mcp_tools:
             del self.mcp_tools[name]
             del self.all_tool_defs[name]
+            self.version += 1
             logger.info(f"Removed MCP tool: {name}")
         else:
             logger.warning(f"Attempted to remove tool '{name}' which was not found.")
@@ -235,6 +310,7 @@ class ToolRegistry:
             )
             self.mcp_tools[tool.name] = (mcp_manager, tool_def)
             self.all_tool_defs[tool.name] = tool_def
+        self.version += 1
 
     def get_tool_definitions(self):
         """Return all tool definitions (local + MCP)."""
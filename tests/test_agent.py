@@ -0,0 +1,424 @@
+import asyncio
+
+import httpx
+import openai
+import pytest
+
+import hica.agent as hica_agent
+from hica.agent import Agent, AgentConfig, ContextSummary, Response, _retry_delay
+from hica.core import Thread
+from hica.memory import InMemoryMemoryStore
+from hica.models import Event, ToolResult
+from hica.tools import BaseTool, ToolRegistry
+
+
+def make_agent(tool_registry=None, **config) -> Agent:
+    # A client is passed so no provider client is created; tests that call
+    # the LLM replace it or the Agent method that would use it.
+    return Agent(
+        config=AgentConfig(**config), tool_registry=tool_registry, client=object()
+    )
+
+
+def script_llm(agent: Agent, *responses, on_call=None):
+    """Make agent.run_llm return each scripted response, as the requested model."""
+    remaining = list(responses)
+
+    async def run_llm(prompt, thread=None, response_model=None, **kwargs):
+        if on_call is not None:
+            on_call(len(responses) - len(remaining))
+        return response_model.model_validate(remaining.pop(0))
+
+    agent.run_llm = run_llm
+
+
+def make_registry() -> ToolRegistry:
+    registry = ToolRegistry()
+
+    @registry.tool()
+    class Add(BaseTool):
+        name = "add"
+        description = "Add two numbers."
+
+        async def execute(self, a: int, b: int) -> ToolResult:
+            return ToolResult(llm_content=str(a + b), display_content=a + b)
+
+    @registry.tool()
+    class Multiply(BaseTool):
+        name = "multiply"
+        description = "Multiply two numbers."
+
+        async def execute(self, a: int, b: int) -> ToolResult:
+            return ToolResult(llm_content=str(a * b), display_content=a * b)
+
+    @registry.tool()
+    class DeleteFile(BaseTool):
+        name = "delete_file"
+        description = "Delete a file."
+
+        def should_confirm(self, params: dict) -> bool:
+            return True
+
+        async def execute(self, path: str) -> ToolResult:
+            return ToolResult(llm_content="deleted", display_content="deleted")
+
+    return registry
+
+
+async def run_loop(agent: Agent, user_input: str) -> Thread:
+    thread = Thread(events=[Event(type="user_input", data=user_input)])
+    async for _ in agent.agent_loop(thread):
+        pass
+    return thread
+
+
+def event_summary(thread: Thread) -> list:
+    return [(e.type, e.step, e.data) for e in thread.events[1:-1]]
+
+
+DONE = {"intent": "done", "reason": "finished"}
+FINAL = {"message": "All done."}
+
+
+@pytest.mark.asyncio
+async def test_summarize_thread_resets_caches_when_one_event_is_dropped():
+    agent = make_agent()
+    thread = Thread(events=[Event(type="user_input", data=f"m{i}") for i in range(6)])
+    thread.llm_messages()
+    thread.serialized_events()
+
+    async def fake_run_llm(*args, **kwargs):
+        return ContextSummary(summary="the story so far")
+
+    agent.run_llm = fake_run_llm
+    # keep_last_n + 1 events: the length and the last event are unchanged
+    await agent.summarize_thread_with_llm(thread, keep_last_n=5)
+
+    assert len(thread.events) == 6
+    assert thread.llm_messages()[0]["content"] == (
+        "Summary of the conversation so far: the story so far"
+    )
+    assert [e["data"] for e in thread.serialized_events()] == [
+        "the story so far",
+        "m1",
+        "m2",
+        "m3",
+        "m4",
+        "m5",
+    ]
+
+
+def test_shared_client_is_created_per_event_loop(monkeypatch):
+    created = []
+
+    def fake_from_provider(model, async_client):
+        created.append(object())
+        return created[-1]
+
+    monkeypatch.setattr("hica.agent.instructor.from_provider", fake_from_provider)
+    agent = Agent(config=AgentConfig(model="openai/test-model"))
+
+    async def get_client_twice():
+        assert agent.client is agent.client
+        return agent.client
+
+    first = asyncio.run(get_client_twice())
+    second = asyncio.run(get_client_twice())
+    assert first is not second
+    assert created == [first, second]
+
+
+@pytest.mark.asyncio
+async def test_parallel_tool_calls_run_together_and_pair_each_response():
+    agent = make_agent(make_registry(), parallel_tool_calls=True)
+    script_llm(
+        agent,
+        {
+            "decisions": [
+                {"intent": "add", "reason": "sum", "arguments": {"a": 2, "b": 3}},
+                {"intent": "multiply", "reason": "x", "arguments": {"a": 2, "b": 3}},
+            ]
+        },
+        {"decisions": [DONE]},
+        FINAL,
+    )
+
+    thread = await run_loop(agent, "add and multiply 2 and 3")
+
+    events = event_summary(thread)
+    assert [(t, step) for t, step, _ in events] == [
+        ("llm_response", "ToolSeclection"),
+        ("llm_response", "ToolSeclection"),
+        ("llm_response", "llm_parameters"),
+        ("llm_response", "llm_parameters"),
+        ("tool_call", None),
+        ("tool_response", None),
+        ("tool_call", None),
+        ("tool_response", None),
+        ("llm_response", "ToolSeclection"),
+    ]
+    assert events[4][2] == {"intent": "add", "arguments": {"a": 2, "b": 3}}
+    assert events[5][2]["response"]["llm_content"] == "5"
+    assert events[6][2] == {"intent": "multiply", "arguments": {"a": 2, "b": 3}}
+    assert events[7][2]["response"]["llm_content"] == "6"
+
+
+@pytest.mark.asyncio
+async def test_failed_parallel_tool_call_is_recorded_without_a_response():
+    registry = make_registry()
+
+    @registry.tool()
+    class Fail(BaseTool):
+        name = "fail"
+        description = "Always fail."
+
+        async def execute(self, reason: str) -> ToolResult:
+            raise RuntimeError(reason)
+
+    agent = make_agent(registry, parallel_tool_calls=True)
+    script_llm(
+        agent,
+        {
+            "decisions": [
+                {"intent": "fail", "reason": "x", "arguments": {"reason": "boom"}},
+                {"intent": "add", "reason": "sum", "arguments": {"a": 2, "b": 3}},
+            ]
+        },
+    )
+    thread = Thread(events=[Event(type="user_input", data="fail then add")])
+
+    with pytest.raises(RuntimeError, match="boom"):
+        async for _ in agent.agent_loop(thread):
+            pass
+
+    calls = [(e.type, e.data.get("intent")) for e in thread.events[5:]]
+    assert calls == [
+        ("tool_call", "fail"),
+        ("tool_call", "add"),
+        ("tool_response", None),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_parallel_calls_needing_confirmation_record_only_the_first():
+    agent = make_agent(make_registry(), parallel_tool_calls=True)
+    script_llm(
+        agent,
+        {
+            "decisions": [
+                {"intent": "delete_file", "reason": "x", "arguments": {"path": "a"}},
+                {"intent": "add", "reason": "sum", "arguments": {"a": 1, "b": 1}},
+            ]
+        },
+    )
+
+    thread = await run_loop(agent, "delete a and add 1 and 1")
+
+    assert [(e.type, e.data.get("intent")) for e in thread.events[1:]] == [
+        ("llm_response", "delete_file"),
+        ("clarification", "clarification"),
+    ]
+
+
+class Notify(BaseTool):
+    name = "notify"
+    description = "Send a notification."
+    side_effect_only = True
+
+    def __init__(self):
+        self.release = asyncio.Event()
+        self.sent = []
+
+    async def execute(self, message: str) -> ToolResult:
+        await self.release.wait()
+        self.sent.append(message)
+        return ToolResult(llm_content="sent", display_content="sent")
+
+
+@pytest.mark.asyncio
+async def test_side_effect_only_tool_runs_in_background_until_loop_ends():
+    registry = ToolRegistry()
+    notify = Notify()
+    registry.add_tool(notify)
+    agent = make_agent(registry)
+
+    def on_call(index):
+        # The loop asks for its next step while the tool is still blocked
+        if index == 1:
+            assert notify.sent == []
+            notify.release.set()
+
+    script_llm(
+        agent,
+        {
+            "decision": {
+                "intent": "notify",
+                "reason": "tell the user",
+                "arguments": {"message": "hi"},
+            }
+        },
+        {"decision": DONE},
+        FINAL,
+        on_call=on_call,
+    )
+
+    thread = await run_loop(agent, "notify me")
+
+    assert notify.sent == ["hi"]
+    responses = [e.data for e in thread.events if e.type == "tool_response"]
+    assert responses == [
+        {"response": "Started in the background.", "source": "ToolRegistry"}
+    ]
+
+
+REQUEST = httpx.Request("POST", "https://api.example.com/v1/chat/completions")
+MESSAGES = [{"role": "user", "content": "hi"}]
+
+
+def api_error(status_code: int, headers=None) -> openai.APIStatusError:
+    response = httpx.Response(status_code, request=REQUEST, headers=headers)
+    return openai.APIStatusError("error", response=response, body=None)
+
+
+class StubClient:
+    """Instructor client stand-in: create() returns or raises the next outcome."""
+
+    def __init__(self, *outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = 0
+        self.chat = self
+        self.completions = self
+
+    async def create(self, response_model, messages, **kwargs):
+        self.calls += 1
+        outcome = self.outcomes.pop(0) if self.outcomes else "ok"
+        if isinstance(outcome, BaseException):
+            raise outcome
+        return response_model(response=outcome)
+
+
+def stub_agent(client: StubClient, **config) -> Agent:
+    # No backoff wait between attempts
+    return Agent(config=AgentConfig(llm_retry_max_delay=0, **config), client=client)
+
+
+def wrapped(error: BaseException) -> Exception:
+    try:
+        raise error
+    except BaseException as cause:
+        try:
+            raise RuntimeError("instructor gave up") from cause
+        except RuntimeError as outer:
+            return outer
+
+
+@pytest.mark.asyncio
+async def test_transient_llm_errors_are_retried():
+    client = StubClient(
+        api_error(429),
+        openai.APIConnectionError(request=REQUEST),
+        wrapped(api_error(503)),
+        "recovered",
+    )
+    agent = stub_agent(client)
+
+    response = await agent._call_llm(MESSAGES, Response)
+
+    assert response.response == "recovered"
+    assert client.calls == 4
+
+
+@pytest.mark.asyncio
+async def test_non_retryable_llm_error_is_not_retried():
+    client = StubClient(api_error(400))
+    agent = stub_agent(client)
+
+    with pytest.raises(ValueError, match="LLM call failed"):
+        await agent._call_llm(MESSAGES, Response)
+    assert client.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_llm_retries_stop_after_llm_max_retries():
+    client = StubClient(*(api_error(500) for _ in range(5)))
+    agent = stub_agent(client, llm_max_retries=2)
+
+    with pytest.raises(ValueError):
+        await agent._call_llm(MESSAGES, Response)
+    assert client.calls == 3
+
+
+def test_retry_delay_uses_retry_after_then_capped_backoff():
+    assert _retry_delay(api_error(429, {"retry-after": "7"}), 0, 30) == 7
+    assert _retry_delay(api_error(429, {"retry-after": "120"}), 0, 30) == 30
+
+    error = api_error(503)
+    assert 0.25 <= _retry_delay(error, 0, 30) <= 0.5
+    assert 2 <= _retry_delay(error, 3, 30) <= 4
+    assert 15 <= _retry_delay(error, 10, 30) <= 30
+
+
+@pytest.mark.asyncio
+async def test_response_cache_hit_skips_the_llm_call():
+    client = StubClient("first", "second")
+    agent = Agent(
+        config=AgentConfig(), client=client, response_cache=InMemoryMemoryStore()
+    )
+
+    first = await agent._call_llm(MESSAGES, Response)
+    again = await agent._call_llm(list(MESSAGES), Response)
+
+    assert (first.response, again.response) == ("first", "first")
+    assert client.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_response_cache_key_covers_messages_model_and_response_model():
+    class OtherResponse(Response):
+        note: str = ""
+
+    agent = Agent(config=AgentConfig(), client=StubClient())
+    key = agent._response_cache_key(MESSAGES, Response)
+
+    assert key == agent._response_cache_key([dict(m) for m in MESSAGES], Response)
+    other_messages = [{"role": "user", "content": "ho"}]
+    assert key != agent._response_cache_key(other_messages, Response)
+    assert key != agent._response_cache_key(MESSAGES, OtherResponse)
+    other_model = Agent(config=AgentConfig(model="openai/gpt-4.1"), client=StubClient())
+    assert key != other_model._response_cache_key(MESSAGES, Response)
+
+
+@pytest.mark.asyncio
+async def test_response_cache_entries_expire_after_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("hica.agent.time.time", lambda: now[0])
+    client = StubClient("first", "second")
+    agent = Agent(
+        config=AgentConfig(response_cache_ttl=60),
+        client=client,
+        response_cache=InMemoryMemoryStore(),
+    )
+
+    await agent._call_llm(MESSAGES, Response)
+    now[0] += 59
+    assert (await agent._call_llm(MESSAGES, Response)).response == "first"
+    now[0] += 2
+    assert (await agent._call_llm(MESSAGES, Response)).response == "second"
+    assert client.calls == 2
+
+
+def test_build_messages_reuses_the_system_prompt_token_estimate(monkeypatch):
+    agent = make_agent(make_registry(), max_context_tokens=1000)
+    thread = Thread(events=[Event(type="user_input", data="hi")])
+    estimated = []
+    estimate_tokens = hica_agent.estimate_tokens
+
+    def counting_estimate(text):
+        estimated.append(text)
+        return estimate_tokens(text)
+
+    monkeypatch.setattr(hica_agent, "estimate_tokens", counting_estimate)
+    agent._build_messages("next step", thread)
+    agent._build_messages("next step", thread)
+
+    assert agent._system_prompt() not in estimated
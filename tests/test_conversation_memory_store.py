@@ -0,0 +1,228 @@
+import asyncio
+import threading
+
+import pytest
+
+from hica.core import Thread
+from hica.memory import ConversationMemoryStore
+from hica.models import Event
+
+
+@pytest.fixture
+def file_store(tmp_path):
+    return ConversationMemoryStore(backend_type="file", context_dir=str(tmp_path))
+
+
+def test_file_store_set_get_delete(file_store):
+    thread = Thread()
+    thread.add_event(type="user_input", data="Hello, file-based world!")
+    file_store.set(thread)
+
+    retrieved = file_store.get(thread.thread_id)
+    assert retrieved is not None
+    assert retrieved.events[0].data == "Hello, file-based world!"
+
+    file_store.delete(thread.thread_id)
+    assert file_store.get(thread.thread_id) is None
+
+
+@pytest.mark.asyncio
+async def test_buffered_writes_are_coalesced_until_flush(tmp_path):
+    store = ConversationMemoryStore(
+        backend_type="file", context_dir=str(tmp_path), flush_interval=60
+    )
+    thread = Thread()
+    thread.add_event(type="user_input", data="first")
+    store.set(thread)
+    thread.add_event(type="llm_response", data={"intent": "done"})
+    store.set(thread)
+
+    file_path = tmp_path / f"{thread.thread_id}.json"
+    assert not file_path.exists()
+    assert store.get(thread.thread_id) is thread
+
+    store.flush()
+    assert file_path.exists()
+    assert len(Thread.from_json(file_path.read_text()).events) == 2
+
+
+@pytest.mark.asyncio
+async def test_flush_single_thread_keeps_others_buffered(tmp_path):
+    store = ConversationMemoryStore(
+        backend_type="file", context_dir=str(tmp_path), flush_interval=60
+    )
+    finished, running = Thread(), Thread()
+    for thread in (finished, running):
+        thread.add_event(type="user_input", data="hi")
+        store.set(thread)
+
+    store.flush(finished.thread_id)
+    assert (tmp_path / f"{finished.thread_id}.json").exists()
+    assert store.buffered(finished.thread_id) is None
+    assert store.buffered(running.thread_id) is running
+    store.flush()
+
+
+@pytest.mark.asyncio
+async def test_failed_flush_keeps_unwritten_threads_buffered(tmp_path, monkeypatch):
+    store = ConversationMemoryStore(
+        backend_type="file", context_dir=str(tmp_path), flush_interval=60
+    )
+    written, failing = Thread(), Thread()
+    for thread in (written, failing):
+        thread.add_event(type="user_input", data="hi")
+        store.set(thread)
+
+    write = store._write
+
+    def flaky_write(thread):
+        if thread is failing:
+            raise OSError("disk full")
+        write(thread)
+
+    monkeypatch.setattr(store, "_write", flaky_write)
+    with pytest.raises(OSError):
+        store.flush()
+    assert store.buffered(written.thread_id) is None
+    assert store.buffered(failing.thread_id) is failing
+
+    monkeypatch.setattr(store, "_write", write)
+    store.flush()
+    assert (tmp_path / f"{failing.thread_id}.json").exists()
+
+
+@pytest.mark.asyncio
+async def test_timed_flush_writes_off_the_event_loop(tmp_path, monkeypatch):
+    store = ConversationMemoryStore(
+        backend_type="file", context_dir=str(tmp_path), flush_interval=0.01
+    )
+    loop_thread = threading.get_ident()
+    writer_threads = []
+    write = store._write
+
+    def recording_write(thread):
+        writer_threads.append(threading.get_ident())
+        write(thread)
+
+    monkeypatch.setattr(store, "_write", recording_write)
+    thread = Thread()
+    thread.add_event(type="user_input", data="hi")
+    store.set(thread)
+    for _ in range(100):
+        if store.buffered(thread.thread_id) is None:
+            break
+        await asyncio.sleep(0.01)
+
+    assert (tmp_path / f"{thread.thread_id}.json").exists()
+    assert writer_threads and loop_thread not in writer_threads
+
+
+def test_cached_get_skips_backend_and_evicts_least_recent(tmp_path):
+    store = ConversationMemoryStore(
+        backend_type="file", context_dir=str(tmp_path), cache_size=2
+    )
+    a, b, c = Thread(), Thread(), Thread()
+    for thread in (a, b):
+        store.set(thread)
+    assert store.get(a.thread_id) is a  # a is now most recent
+    store.set(c)  # evicts b
+
+    (tmp_path / f"{a.thread_id}.json").unlink()
+    assert store.get(a.thread_id) is a
+    assert store.get(b.thread_id) is not b
+    assert store.get(b.thread_id).thread_id == b.thread_id
+
+    store.delete(a.thread_id)
+    assert store.get(a.thread_id) is None
+
+
+def test_log_store_appends_new_events_and_rewrites_after_truncation(tmp_path):
+    store = ConversationMemoryStore(backend_type="log", context_dir=str(tmp_path))
+    thread = Thread(metadata={"user": "u1"})
+    thread.add_event(type="user_input", data="first")
+    store.set(thread)
+    thread.add_event(type="llm_response", data={"intent": "done"})
+    store.set(thread)
+
+    log_path = tmp_path / f"{thread.thread_id}.ndjson"
+    assert len(log_path.read_bytes().splitlines()) == 2
+    reloaded = ConversationMemoryStore(backend_type="log", context_dir=str(tmp_path))
+    loaded = reloaded.get(thread.thread_id)
+    assert loaded.model_dump() == thread.model_dump()
+
+    thread.summarize_context(max_events=1)
+    store.set(thread)
+    assert len(log_path.read_bytes().splitlines()) == 1
+    assert list(store.all()) == [thread.thread_id]
+
+    store.delete(thread.thread_id)
+    assert store.get(thread.thread_id) is None
+
+
+def test_log_store_rewrites_after_replace_events_with_same_length(tmp_path):
+    store = ConversationMemoryStore(backend_type="log", context_dir=str(tmp_path))
+    thread = Thread()
+    thread.add_event(type="user_input", data="first")
+    thread.add_event(type="user_input", data="second")
+    store.set(thread)
+
+    thread.replace_events([Event(type="context_summary", data="s"), thread.events[-1]])
+    store.set(thread)
+
+    reloaded = ConversationMemoryStore(backend_type="log", context_dir=str(tmp_path))
+    loaded = reloaded.get(thread.thread_id)
+    assert [e.type for e in loaded.events] == ["context_summary", "user_input"]
+
+
+@pytest.mark.asyncio
+async def test_aflush_writes_a_snapshot_of_one_thread(tmp_path):
+    store = ConversationMemoryStore(
+        backend_type="log", context_dir=str(tmp_path), flush_interval=60
+    )
+    finished, running = Thread(), Thread()
+    for thread in (finished, running):
+        thread.add_event(type="user_input", data="hi")
+        store.set(thread)
+
+    flushing = asyncio.ensure_future(store.aflush(finished.thread_id))
+    await asyncio.sleep(0)  # aflush snapshots, then waits on the write
+    # Appended after the snapshot was taken: not part of this write
+    finished.add_event(type="user_input", data="later")
+    await flushing
+
+    log_path = tmp_path / f"{finished.thread_id}.ndjson"
+    assert len(log_path.read_bytes().splitlines()) == 1
+    assert store.buffered(finished.thread_id) is None
+    assert store.buffered(running.thread_id) is running
+    store.flush()
+
+
+@pytest.mark.asyncio
+async def test_aget_reads_the_backend_once_then_serves_from_cache(tmp_path):
+    writer = ConversationMemoryStore(backend_type="log", context_dir=str(tmp_path))
+    thread = Thread()
+    thread.add_event(type="user_input", data="hi")
+    writer.set(thread)
+
+    store = ConversationMemoryStore(
+        backend_type="log", context_dir=str(tmp_path), cache_size=2
+    )
+    loaded = await store.aget(thread.thread_id)
+    assert loaded.model_dump() == thread.model_dump()
+    assert await store.aget(thread.thread_id) is loaded
+    assert await store.aget("missing") is None
+
+
+def test_failed_file_write_leaves_no_temp_file(tmp_path, monkeypatch):
+    store = ConversationMemoryStore(backend_type="file", context_dir=str(tmp_path))
+    thread = Thread()
+    thread.add_event(type="user_input", data="hi")
+
+    def failing_write_json(self, fp):
+        fp.write(b"{")
+        raise OSError("disk full")
+
+    monkeypatch.setattr(Thread, "write_json", failing_write_json)
+    with pytest.raises(OSError):
+        store.set(thread)
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,62 @@
+import logging
+
+import orjson
+
+from hica.logging import ThreadFileHandler, get_thread_logger
+
+
+def make_record(event: dict) -> logging.LogRecord:
+    return logging.LogRecord(
+        "hica", logging.INFO, __file__, 1, orjson.dumps(event).decode(), None, None
+    )
+
+
+def test_thread_file_handler_only_writes_registered_threads_by_default(
+    tmp_path, monkeypatch
+):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "logs").mkdir()
+    get_thread_logger("registered-1")
+    handler = ThreadFileHandler()
+    try:
+        handler.handle(make_record({"event": "step", "thread_id": "registered-1"}))
+        handler.handle(make_record({"event": "step", "thread_id": "web-1"}))
+    finally:
+        handler.close()
+
+    assert [p.name for p in (tmp_path / "logs").iterdir()] == [
+        "thread_registered-1.log"
+    ]
+
+
+def test_thread_file_handler_with_all_threads_routes_any_thread_id(
+    tmp_path, monkeypatch
+):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "logs").mkdir()
+    handler = ThreadFileHandler(all_threads=True)
+    try:
+        # thread_id bound through structlog.contextvars, not get_thread_logger
+        handler.handle(make_record({"event": "step", "thread_id": "web-1"}))
+        handler.handle(make_record({"event": "no thread"}))
+        handler.handle(make_record({"event": "bad", "thread_id": "../escape"}))
+    finally:
+        handler.close()
+
+    assert [p.name for p in (tmp_path / "logs").iterdir()] == ["thread_web-1.log"]
+    assert '"event":"step"' in (tmp_path / "logs" / "thread_web-1.log").read_text()
+
+
+def test_thread_file_handler_reports_open_errors_instead_of_raising(
+    tmp_path, monkeypatch
+):
+    # No logs/ directory, so opening the file fails
+    monkeypatch.chdir(tmp_path)
+    errors = []
+    handler = ThreadFileHandler(all_threads=True)
+    monkeypatch.setattr(handler, "handleError", errors.append)
+    record = make_record({"event": "step", "thread_id": "web-1"})
+
+    handler.handle(record)
+
+    assert errors == [record]
@@ -35,3 +35,16 @@ def test_mongo_memory_store_set_get_delete(mongo_store):
     # Delete the thread
     mongo_store.delete(thread.thread_id)
     assert mongo_store.get(thread.thread_id) is None
+
+
+def test_mongo_memory_store_set_many(mongo_store):
+    threads = [Thread() for _ in range(3)]
+    for i, thread in enumerate(threads):
+        thread.add_event(type="user_input", data=f"message {i}")
+
+    mongo_store.mongo_store.set_many({t.thread_id: t for t in threads})
+
+    for i, thread in enumerate(threads):
+        retrieved = mongo_store.get(thread.thread_id)
+        assert retrieved.events[0].data == f"message {i}"
+        mongo_store.delete(thread.thread_id)
@@ -0,0 +1,22 @@
+from hica.agent import estimate_tokens, prune_to_token_budget
+
+
+def message(content):
+    return {"role": "user", "content": content}
+
+
+def test_history_within_budget_is_unchanged():
+    history = [message("a" * 40), message("b" * 40)]
+    assert prune_to_token_budget(history, 100) is history
+
+
+def test_keeps_first_and_latest_messages():
+    history = [message(str(i) * 40) for i in range(10)]  # 10 tokens each
+    pruned = prune_to_token_budget(history, 45)
+
+    assert pruned[0] is history[0]
+    assert pruned[1]["content"] == (
+        "[6 earlier messages omitted to fit the context window]"
+    )
+    assert pruned[2:] == history[-3:]
+    assert sum(estimate_tokens(m["content"]) for m in pruned[2:]) <= 35
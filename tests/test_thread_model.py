@@ -1,5 +1,8 @@
+import io
 import uuid
 
+import pytest
+
 from hica.core import Thread
 from hica.models import Event
 
@@ -27,3 +30,124 @@ def test_events_and_metadata_are_not_shared():
     t1.metadata["foo"] = "bar"
     assert t2.events == [], "Events should not be shared between Thread instances."
     assert t2.metadata == {}, "Metadata should not be shared between Thread instances."
+
+
+def test_serialized_events_track_appends_and_truncation():
+    t = Thread(events=[Event(type="user_input", data="hi")])
+    assert t.serialized_events() == [
+        {"type": "user_input", "step": None, "data": "hi"}
+    ]
+
+    t.add_event(type="tool_response", data={"response": 3}, step="add")
+    assert t.serialized_events(1) == [
+        {"type": "tool_response", "step": "add", "data": {"response": 3}}
+    ]
+
+    t.summarize_context(max_events=1)
+    assert [e["type"] for e in t.serialized_events()] == ["tool_response"]
+
+
+def test_thread_json_round_trip():
+    t = Thread(metadata={"user": "alice"})
+    t.add_event(type="user_input", data="hi")
+    t.add_event(type="tool_response", data={"response": [1, 2]}, step="tool")
+
+    restored = Thread.from_json(t.to_json())
+    assert restored.thread_id == t.thread_id
+    assert restored.metadata == {"user": "alice"}
+    assert [e.data for e in restored.events] == ["hi", {"response": [1, 2]}]
+
+
+def test_thread_from_invalid_json_raises_value_error():
+    with pytest.raises(ValueError, match="Invalid JSON"):
+        Thread.from_json("{not json")
+
+
+def test_llm_messages_render_new_events_only_and_skip_unsent_types():
+    t = Thread(events=[Event(type="user_input", data="add 2 and 3")])
+    t.add_event(type="tool_call", data={"intent": "add", "arguments": {"a": 2}})
+    first = t.llm_messages()
+    assert first == [{"role": "user", "content": "add 2 and 3"}]
+
+    t.add_event(type="tool_response", data={"response": {"llm_content": "5"}})
+    messages = t.llm_messages()
+    assert messages[0] is first[0]
+    assert messages[1] == {"role": "user", "content": "Tool execution result: 5"}
+
+
+def test_llm_messages_collapse_a_repeated_tool_step_with_a_count():
+    t = Thread(events=[Event(type="user_input", data="ping twice")])
+    for _ in range(3):
+        t.add_event(type="llm_response", data={"intent": "ping", "arguments": {}})
+        t.add_event(type="tool_response", data={"response": "pong"})
+    t.add_event(type="user_input", data="again")
+    t.add_event(type="llm_response", data={"intent": "ping", "arguments": {}})
+    t.add_event(type="tool_response", data={"response": "pong"})
+
+    contents = [m["content"] for m in t.llm_messages()]
+    assert contents == [
+        "ping twice",
+        "Selected tool 'ping' with parameters: {}",
+        "Tool execution result: pong (repeated 3 times)",
+        "again",
+        "Selected tool 'ping' with parameters: {}",
+        "Tool execution result: pong",
+    ]
+    assert t.events[2].rendered_message["content"] == "Tool execution result: pong"
+
+
+def test_serialize_for_llm_xml_renders_each_event_once():
+    t = Thread(events=[Event(type="user_input", data="add 2 & 3")])
+    t.add_event(type="llm_response", data={"intent": "add", "a": 2, "b": 3})
+    expected = "<user_input>add 2 &amp; 3</user_input>\n<add><a>2</a><b>3</b></add>"
+    assert t.serialize_for_llm(format="xml") == expected
+    assert t.serialize_one_event(t.events[1]) is t.events[1].rendered_xml
+
+
+def test_from_json_trusted_matches_validated_load():
+    t = Thread(metadata={"user": "u1"})
+    t.add_event(type="user_input", data="hi")
+    t.add_event(type="llm_response", data={"intent": "done"}, step="final")
+    t.add_event(type="tool_response", data=None)
+
+    loaded = Thread.from_json_trusted(t.to_json())
+    assert loaded.model_dump() == t.model_dump()
+    assert loaded.llm_messages() == t.llm_messages()
+
+
+def test_add_event_unchecked_keeps_data_and_caches():
+    t = Thread()
+    data = {"intent": "add", "arguments": {"a": 2}}
+    t.add_event_unchecked(type="llm_response", data=data, step="llm_parameters")
+    assert t.events[0].data is data
+    assert t.events[0].step == "llm_parameters"
+    assert t.serialized_events() == [
+        {"type": "llm_response", "step": "llm_parameters", "data": data}
+    ]
+
+
+def test_write_json_round_trips():
+    t = Thread(metadata={"user": "u1"})
+    t.add_event(type="user_input", data="hi")
+    t.add_event(type="llm_response", data={"intent": "done"}, step="final")
+
+    buffer = io.BytesIO()
+    t.write_json(buffer)
+    assert Thread.from_json(buffer.getvalue()).model_dump() == t.model_dump()
+    assert Thread.from_json_trusted(buffer.getvalue()).model_dump() == t.model_dump()
+
+
+def test_replace_events_resets_caches_when_length_and_tail_are_unchanged():
+    t = Thread(events=[Event(type="user_input", data=f"msg {i}") for i in range(6)])
+    t.llm_messages()
+    t.serialized_events()
+
+    # Summary plus the last 5 events: same length and same last event object
+    t.replace_events([Event(type="context_summary", data="earlier"), *t.events[1:]])
+
+    assert t.llm_messages()[0] == {
+        "role": "user",
+        "content": "Summary of the conversation so far: earlier",
+    }
+    assert t.serialized_events()[0]["type"] == "context_summary"
+    assert t.events_version == 1